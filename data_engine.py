@@ -1,9 +1,33 @@
 import json
+import atexit
+import csv
+import mmap
+import queue
+import re
+import struct
+import threading
+import time
+import os
+import unicodedata
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from datetime import datetime
+from heapq import merge
+from hashlib import sha1
+from os import stat, remove, path
 
 
 class BaseReader:
 
     backup_directory_name = "Backups"
+    journal_suffix = ".journal"
+    journal_batch_key = "batch"
+    # Guards shared documents when writers and background workers use them
+    document_lock = threading.RLock()
+    # Shared documents cache: file name -> (file stamp, loaded dict, journal length)
+    __documents = {}
 
     def __init__(self):
         self.library_file_name = "data.json"
@@ -11,28 +35,224 @@ class BaseReader:
 
     def load_json(self, file_name: str):
         """
-        Loads JSON file and returns dict.
+        Loads JSON file and returns dict. Parsed files are kept in shared cache
+        and parsed again only when file or journal mtime or size changes.
+        Returned dict is shared by all readers, copy it before any changes.
         :param str file_name: JSON file name to load
         :return: dict from json
         """
+        stamp = self.__file_stamp(file_name)
+        cached = self.__documents.get(file_name)
+        if cached and cached[0] == stamp:
+            return cached[1]
         try:
-            with open(file_name, "r", encoding="utf-8") as data_file:
-                loaded_file = json.load(data_file)
-            return loaded_file
-        except json.JSONDecodeError:
-            backup_version = self.__load_backup_file_name(file_name)
+            loaded_file = self.__read_file(file_name)
+        except ValueError:
+            backup_version, loaded_file = self.__load_backup_file(file_name)
             print(f"File {file_name} is broken, load backup version {backup_version}")
-            return self.load_json(backup_version)
+        journal_length = self.__replay_journal(file_name, loaded_file)
+        self.__documents[file_name] = (stamp, loaded_file, journal_length)
+        return loaded_file
+
+    def library_backend(self):
+        """
+        Returns storage backend selected in config.
+        :return: JsonBackend/SqliteBackend object
+        """
+        if EngineConfigReader().return_backend() == "sqlite":
+            return SqliteBackend()
+        return JsonBackend()
+
+    def load_library(self):
+        """
+        Loads library document from storage backend selected in config.
+        :return: dict with Items/Tasks sections
+        """
+        return self.library_backend().load_document()
+
+    def save_json(self, file_name: str, data: dict, cache: bool = True):
+        """
+        Writes dict into JSON file atomically and updates shared cache.
+        Saved file replaces its journal, so journal is removed.
+        :param str file_name: JSON file name to write
+        :param dict data: dict to save
+        :param bool cache: disables cache update, used for copies like backups
+        :return: Nothing
+        """
+        try:
+            content = json.dumps(data, ensure_ascii=False, indent=4, default=self.encode_record).encode("utf-8")
+            sync_directory = EngineConfigReader().return_fsync_directory()
+            self.atomic_write(file_name, content, sync_directory)
+            if path.exists(file_name + self.journal_suffix):
+                remove(file_name + self.journal_suffix)
+        except Exception:
+            self.clear_cache(file_name)
+            raise
+        if cache:
+            self.__documents[file_name] = (self.__file_stamp(file_name), data, 0)
+        else:
+            self.clear_cache(file_name)
+
+    def append_journal(self, file_name: str, data: dict, entries: list):
+        """
+        Appends changes to file journal, one JSON line per change.
+        :param str file_name: JSON file name the journal belongs to
+        :param dict data: loaded dict with changes already applied
+        :param list entries: dicts with section, id and data (None for delete)
+        :return: int number of writes in journal
+        """
+        try:
+            with open(file_name + self.journal_suffix, "a+b") as journal_file:
+                # Interrupted write leaves line without end, new entries have to start in new line
+                if journal_file.tell() > 0:
+                    journal_file.seek(-1, 2)
+                    if journal_file.read(1) != b"\n":
+                        journal_file.write(b"\n")
+            # Many changes are written as one line, so interrupted write drops all of them or none
+            lines = entries if len(entries) == 1 else [{self.journal_batch_key: entries}]
+            with open(file_name + self.journal_suffix, "a", encoding="utf-8") as journal_file:
+                for entry in lines:
+                    journal_file.write(json.dumps(entry, ensure_ascii=False, default=self.encode_record) + "\n")
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+        except Exception:
+            self.clear_cache(file_name)
+            raise
+        cached = self.__documents.get(file_name)
+        journal_length = cached[2] + len(lines) if cached and cached[1] is data else len(lines)
+        self.__documents[file_name] = (self.__file_stamp(file_name), data, journal_length)
+        return journal_length
+
+    @staticmethod
+    def encode_record(value):
+        """
+        Renders record objects for json module.
+        :param value: object unknown to json module
+        :return: dict with JSON keys
+        """
+        if isinstance(value, Record):
+            return value.to_json()
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    @staticmethod
+    def atomic_write(file_name: str, content: bytes, sync_directory: bool = False):
+        """
+        Writes file content into temporary file and replaces given file with it,
+        so interrupted write never leaves broken file.
+        :param str file_name: file name to write
+        :param bytes content: file content
+        :param bool sync_directory: flushes directory entry too, needed to survive power loss on some systems
+        :return: Nothing
+        """
+        temp_file_name = file_name + ".tmp"
+        with open(temp_file_name, "wb") as temp_file:
+            temp_file.write(content)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_file_name, file_name)
+        if sync_directory and hasattr(os, "O_DIRECTORY"):
+            directory = os.open(path.dirname(path.abspath(file_name)), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+
+    @classmethod
+    def clear_cache(cls, file_name: str = None):
+        """
+        Drops cached documents.
+        :param str file_name: file name to drop, all files if not given
+        :return: Nothing
+        """
+        if file_name:
+            cls.__documents.pop(file_name, None)
+        else:
+            cls.__documents.clear()
+
+    @classmethod
+    def __file_stamp(cls, file_name: str):
+        """
+        Returns file stamp used to invalidate cache.
+        :param str file_name: file name
+        :return: tuple with mtime and size of file and its journal
+        """
+        file_stat = stat(file_name)
+        try:
+            journal_stat = stat(file_name + cls.journal_suffix)
+            journal_stamp = (journal_stat.st_mtime_ns, journal_stat.st_size)
+        except FileNotFoundError:
+            journal_stamp = (None, None)
+        return (file_stat.st_mtime_ns, file_stat.st_size) + journal_stamp
+
+    @staticmethod
+    def __read_file(file_name: str):
+        """
+        Reads JSON file. File is replaced atomically, so it is whole or old one; file which
+        can not be parsed (interrupted write on system without atomic replace, disk error) raises ValueError.
+        :param str file_name: JSON file name
+        :return: dict from json
+        """
+        with open(file_name, "rb") as data_file:
+            return json.loads(data_file.read())
+
+    @classmethod
+    def read_journal(cls, file_name: str):
+        """
+        Reads journal entries of file. Broken last line (interrupted write) is skipped.
+        :param str file_name: JSON file name the journal belongs to
+        :return: generator of dicts with section, id and data (None for delete)
+        """
+        for entries in cls.__read_journal_writes(file_name):
+            yield from entries
+
+    @classmethod
+    def __read_journal_writes(cls, file_name: str):
+        """
+        Reads journal lines, every line keeps entries of one write.
+        :param str file_name: JSON file name the journal belongs to
+        :return: generator of lists of entries
+        """
+        try:
+            journal_file = open(file_name + cls.journal_suffix, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with journal_file:
+            for line in journal_file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Journal of {file_name} has broken entry, skipped")
+                    continue
+                yield entry[cls.journal_batch_key] if cls.journal_batch_key in entry else [entry]
 
     @classmethod
-    def __load_backup_file_name(cls, file_name: str):
-        from os import listdir
-        names_list = []
-        for file in listdir(cls.backup_directory_name):
-            if file_name in file:
-                names_list.append(file)
-        names_list.sort()
-        return cls.backup_directory_name + "/" + names_list[len(names_list) - 1]
+    def __replay_journal(cls, file_name: str, data: dict):
+        """
+        Applies journal entries on loaded dict.
+        :param str file_name: JSON file name the journal belongs to
+        :param dict data: loaded dict
+        :return: int number of applied writes
+        """
+        journal_length = 0
+        for entries in cls.__read_journal_writes(file_name):
+            for entry in entries:
+                section = data.setdefault(entry["section"], {})
+                if entry["data"] is None:
+                    section.pop(entry["id"], None)
+                else:
+                    section[entry["id"]] = entry["data"]
+            journal_length += 1
+        return journal_length
+
+    def __load_backup_file(self, file_name: str):
+        """
+        Loads last backup version of given file.
+        :param str file_name: JSON file name
+        :return: tuple with backup version and dict from backup
+        """
+        backup = BackupJson(file_name == self.library_file_name)
+        backup_version = backup.return_last_version()
+        return backup_version, backup.restore_version(backup_version)
 
     @staticmethod
     def __check_exists(file_name):
@@ -49,6 +269,134 @@ class BaseReader:
         return True
 
 
+class FileLock:
+
+    lock_suffix = ".lock"
+    __poll_interval = 0.05
+    # Shared locks: absolute file name -> FileLock, lock file is opened once per process
+    __locks = {}
+    __locks_guard = threading.Lock()
+    # Locking module of current system, False when system has none
+    __locking = None
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.timeout = EngineConfigReader().return_lock_timeout()
+        # Threads of this process wait here, lock file is locked only by the first of them
+        self.__thread_lock = threading.RLock()
+        self.__depth = 0
+        self.__file = None
+
+    # region Public methods
+
+    @classmethod
+    def for_file(cls, file_name: str):
+        """
+        Returns lock shared by all writers of given file. Lock is advisory, it is held
+        in other processes only by this app, and it is reentrant in the same thread.
+        :param str file_name: locked file name, lock is kept in file with .lock suffix
+        :return: FileLock object
+        """
+        key = path.abspath(file_name)
+        with cls.__locks_guard:
+            if key not in cls.__locks:
+                cls.__locks[key] = cls(file_name)
+            return cls.__locks[key]
+
+    def __enter__(self):
+        self.__thread_lock.acquire()
+        if self.__depth == 0:
+            try:
+                self.__lock_file()
+            except BaseException:
+                self.__thread_lock.release()
+                raise
+        self.__depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.__depth -= 1
+        try:
+            if self.__depth == 0:
+                self.__unlock_file()
+        finally:
+            self.__thread_lock.release()
+
+    # endregion
+    # region Private methods
+
+    def __lock_file(self):
+        """
+        Opens lock file and waits until other processes unlock it.
+        :return: Nothing
+        """
+        locking = self.__load_locking()
+        if not locking:
+            return
+        self.__file = open(self.file_name + self.lock_suffix, "a+b")
+        deadline = time.monotonic() + self.timeout
+        while not self.__try_lock(locking):
+            if time.monotonic() >= deadline:
+                self.__file.close()
+                self.__file = None
+                raise TimeoutError(f"File {self.file_name} is locked by other process")
+            time.sleep(self.__poll_interval)
+
+    def __try_lock(self, locking):
+        """
+        Locks lock file without waiting.
+        :param locking: fcntl or msvcrt module
+        :return: True if file was locked
+        """
+        try:
+            if hasattr(locking, "flock"):
+                locking.flock(self.__file.fileno(), locking.LOCK_EX | locking.LOCK_NB)
+            else:
+                self.__file.seek(0)
+                locking.locking(self.__file.fileno(), locking.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def __unlock_file(self):
+        """
+        Unlocks and closes lock file.
+        :return: Nothing
+        """
+        if self.__file is None:
+            return
+        locking = self.__load_locking()
+        try:
+            if hasattr(locking, "flock"):
+                locking.flock(self.__file.fileno(), locking.LOCK_UN)
+            else:
+                self.__file.seek(0)
+                locking.locking(self.__file.fileno(), locking.LK_UNLCK, 1)
+        finally:
+            self.__file.close()
+            self.__file = None
+
+    @classmethod
+    def __load_locking(cls):
+        """
+        Imports locking module on first use, fcntl on Unix and msvcrt on Windows.
+        Without both of them file is guarded only between threads of this process.
+        :return: module, False when system has no file locking
+        """
+        if cls.__locking is None:
+            try:
+                import fcntl as locking
+            except ImportError:
+                try:
+                    import msvcrt as locking
+                except ImportError:
+                    locking = False
+            cls.__locking = locking
+        return cls.__locking
+
+    # endregion
+
+
 class TreeviewConfigReader:
 
     __ti_treeview = __material_treeview = __work_material_treeview = __steps_treeview = []
@@ -175,6 +523,13 @@ class WindowConfigReader:
         """
         return self.__mainloop_section["ti_list_height"]
 
+    def return_ti_list_overscan(self):
+        """
+        Returns number of tasks/items rows loaded below visible part of list
+        :return: int number of rows
+        """
+        return self.__mainloop_section.get("ti_list_overscan", 20)
+
     def return_material_list_height(self):
         """
         Returns material list height
@@ -196,6 +551,20 @@ class WindowConfigReader:
         """
         return self.__mainloop_section["steps_list_height"]
 
+    def return_details_cache_size(self):
+        """
+        Returns number of items which details are kept in memory
+        :return: int cache size
+        """
+        return self.__mainloop_section.get("details_cache_size", 64)
+
+    def return_startup_budget(self):
+        """
+        Returns startup milestones budget
+        :return: dict milestone name -> max seconds from start
+        """
+        return {key: value for key, value in self.file.get("StartupBudget", {}).items() if key != "_comment"}
+
     def return_default_view(self):
         """
         Returns default view setting
@@ -281,247 +650,1924 @@ class WindowConfigReader:
     # endregion
 
 
-class DataReader:
+class EngineConfigReader:
 
-    data_dict = {}
-    __id_name = "id"
-    __data_name = "data"
-    __item_type = "Items"
-    __task_type = "Tasks"
+    __engine_section_str = "DataEngine"
 
-    def __init__(self, item_type: bool):
+    def __init__(self):
         base_reader = BaseReader()
-        self.file = base_reader.load_json(base_reader.library_file_name)
-        if item_type:
-            self.__dict = self.file[self.__item_type]
-        else:
-            self.__dict = self.file[self.__task_type]
+        file = base_reader.load_json(base_reader.config_file_name)
+        self.__engine_section = file.get(self.__engine_section_str, {})
 
     # region Public methods
 
-    def return_all_data(self):
+    def return_journal_mode(self):
         """
-        Startup func.
-        :return: dict with all task/items
+        Returns journal mode setting.
+        :return: bool True if changes are appended to journal
         """
-        self.__sort_via_id()
-        return self.data_dict
+        return self.__engine_section.get("journal_mode", False)
 
-    def return_data_dict(self, item_id):
+    def return_journal_compact_limit(self):
         """
-        Startup func.
-        :param int item_id: task/item id
-        :return: dict data for given task/item
+        Returns number of journal writes after which journal is compacted.
+        :return: int journal writes limit
         """
-        dict_id = "id_" + str(item_id)
-        return self.__dict[dict_id]
+        return self.__engine_section.get("journal_compact_limit", 100)
 
-    def return_ids(self):
+    def return_async_backup(self):
         """
-        Startup func.
-        :return: list of ids
+        Returns async backup setting.
+        :return: bool True if backups are created by background worker
         """
-        self.__sort_via_id()
-        return sorted(self.data_dict.keys())
+        return self.__engine_section.get("async_backup", False)
 
-    def return_last_id(self):
+    def return_backup_window(self):
         """
-        Startup func.
-        :return: int last id
+        Returns time window in which background worker joins backups into one version.
+        :return: float window in seconds
         """
-        return self.return_ids()[-1]
+        return self.__engine_section.get("backup_window", 1.0)
 
-    # endregion
-    # region Private methods
+    def return_fsync_directory(self):
+        """
+        Returns directory sync setting for atomic writes.
+        :return: bool True if directory is synced after file replace
+        """
+        return self.__engine_section.get("fsync_directory", False)
 
-    def __sort_via_id(self):
+    def return_backend(self):
         """
-        Collect all data from JSON sorted by ID.
-        :return: Nothing
+        Returns storage backend name.
+        :return: str json/sqlite
         """
-        self.__clean_dicts()
-        for item in self.__dict:
-            self.data_dict.update({self.__get_id(item): self.__dict[item]})
+        return self.__engine_section.get("backend", "json")
 
-    @staticmethod
-    def __get_id(json_id: str):
+    def return_sqlite_file_name(self):
         """
-        Changes JSON id data into int.
-        :param str json_id:
-        :return: int item/task id
+        Returns SQLite database file name.
+        :return: str file name
         """
-        result = json_id.split("_")
-        return result[1]
+        return self.__engine_section.get("sqlite_file_name", "data.sqlite")
 
-    def __clean_dicts(self):
+    def return_archive_file_name(self):
         """
-        Clears class dicts.
-        :return: Nothing
+        Returns file name of archived tasks.
+        :return: str file name
         """
-        self.data_dict.clear()
+        return self.__engine_section.get("archive_file_name", "tasks.archive")
+
+    def return_archive_before(self):
+        """
+        Returns date like "01.01.24", tasks older than it are moved into archive.
+        :return: str date, empty when archiving is not configured
+        """
+        return self.__engine_section.get("archive_before", "")
+
+    def return_lock_timeout(self):
+        """
+        Returns seconds writer waits for lock file held by other process.
+        :return: float seconds
+        """
+        return float(self.__engine_section.get("lock_timeout", 10))
 
     # endregion
 
 
-class ItemsWriter:
+class Record:
 
-    __item_section_str = "Items"
-    __item_struct = {
-        "name": str,
-        "time": str,
-        "work_materials": dict,
-        "materials": dict,
-        "material_cost": float,
-        "sell_cost": float,
-        "production_steps": dict,
-        "ad_info": str
-    }
-    __material_section_str = "materials"
-    __materials_struct = {
-        "id": int,
-        "material": str,
-        "size": str,
-        "number_of": int,
-        "time_for": int
-    }
-    __work_materials_section_str = "work_materials"
-    __work_materials_struct = {
-        "id": int,
-        "material": str,
-        "size": str,
-        "number_of": int,
-        "cost": float
-    }
-    __steps_section_str = "production_steps"
-    __steps_struct = {
-        "id": int,
-        "step": str,
-        "time": int
-    }
-    __default_int = 0
-    __default_str = "N/A"
-    __loaded_item = {}
-    __materials_dict = {}
-    __work_materials_dict = {}
-    __steps_dict = {}
+    __slots__ = ("extra", "missing")
+    # Marks JSON key missing in read dict
+    __missing_value = object()
+    # JSON key and attribute name pairs
+    fields = ()
+    # Nested sections: JSON key -> record class
+    nested = {}
 
-    def __init__(self):
-        read_base = DataReader(True)
-        self.json_update = UpdateJson(True)
-        self.last_id = read_base.return_last_id()
-        self.ids = read_base.return_ids()
+    def __init__(self, **kwargs):
+        for json_key, attribute in self.fields:
+            setattr(self, attribute, kwargs.get(attribute))
+        self.extra = None
+        self.missing = None
 
-    # region Public Methods
+    @classmethod
+    def from_json(cls, data: dict):
+        """
+        Creates record from JSON dict. Unknown keys are kept in extra, missing keys
+        are remembered, so to_json does not write them back as null.
+        :param dict data: record read from JSON
+        :return: record object
+        """
+        record = cls.__new__(cls)
+        missing_value = cls.__missing_value
+        missing = None
+        for json_key, attribute in cls.fields:
+            value = data.get(json_key, missing_value)
+            if value is missing_value:
+                missing = (missing or ()) + (json_key,)
+                value = None
+            elif value is not None and json_key in cls.nested:
+                value = cls.__read_nested(cls.nested[json_key], value)
+            setattr(record, attribute, value)
+        record.missing = missing
+        record.extra = None
+        # Unknown keys exist only when dict has more keys than fields it has
+        if len(data) > len(cls.fields) - len(missing or ()):
+            record.extra = {key: value for key, value in data.items() if key not in cls.attributes}
+        return record
 
-    def clean_dicts(self,
-                    item_bool: bool = True,
-                    materials_bool: bool = True,
-                    work_materials_bool: bool = True,
-                    steps_bool: bool = True):
+    @staticmethod
+    def __read_nested(nested_class, value: dict):
         """
-        Cleans all dicts
-        :param item_bool: disables clean method
-        :param materials_bool: disables clean method
-        :param work_materials_bool: disables clean method
-        :param steps_bool: disables clean method
-        :return: Nothing
+        Creates nested records. Old files keep single record instead of dict of records.
+        :param nested_class: nested record class
+        :param dict value: nested section read from JSON
+        :return: dict int id -> record
         """
-        if item_bool:
-            self.__loaded_item.clear()
-        if materials_bool:
-            self.__materials_dict.clear()
-        if work_materials_bool:
-            self.__work_materials_dict.clear()
-        if steps_bool:
-            self.__steps_dict.clear()
+        if not all(isinstance(nested, dict) for nested in value.values()):
+            value = {value.get("id", 0): value}
+        return {int(nested_id): nested_class.from_json(nested) for nested_id, nested in value.items()}
 
-    def load_item(self, json_id: int):
+    def to_json(self):
         """
-        Start up func. Loads json item to class variables.
-        :param json_id: json ID
-        :return: Nothing
+        Renders record as JSON dict.
+        :return: dict with JSON keys
         """
-        self.__load_json_item(self.__render_json_id(json_id))
+        result = {}
+        for json_key, attribute in self.fields:
+            value = getattr(self, attribute)
+            if value is None and self.missing and json_key in self.missing:
+                continue
+            if json_key in self.nested and value is not None:
+                value = {str(nested_id): nested.to_json() for nested_id, nested in value.items()}
+            result[json_key] = value
+        if self.extra:
+            result.update(self.extra)
+        return result
 
-    def add_new_item(self,
-                     name: str,
-                     time: str,
-                     material_cost: float,
-                     sell_cost: float,
-                     ad_info: str = None):
+    def get(self, json_key: str, default=None):
         """
-        Adds new item to json file.
-        :param str name: name
-        :param str time: time
-        :param float material_cost: material cost
-        :param float sell_cost: prince
-        :param str ad_info: additional info
-        :return: Nothing
+        Returns value for JSON key.
+        :param str json_key: JSON key
+        :param default: value returned for unknown key
+        :return: field value
         """
-        new_id = self.__render_json_id(int(self.last_id) + 1)
-        if not ad_info:
-            ad_info = self.__check_default(str)
-        data = self.__render_temp_dict(
-            self.__prepare_data_list(
-                name,
-                time,
-                self.__work_materials_dict,
-                self.__materials_dict,
-                material_cost,
-                sell_cost,
-                self.__steps_dict,
-                ad_info
-            ),
-            self.__item_struct
-        )
-        self.json_update.update_json(new_id, data)
-        self.clean_dicts()
+        attribute = self.attributes.get(json_key)
+        if attribute:
+            return getattr(self, attribute)
+        return self.extra.get(json_key, default) if self.extra else default
 
-    def update_item(self,
-                    json_id: int,
-                    name: str = None,
-                    time: str = None,
-                    material_cost: float = None,
-                    sell_cost: float = None,
-                    ad_info: str = None):
-        self.load_item(json_id)
-        work_materials = self.__work_materials_dict \
-            if len(self.__work_materials_dict) > 0 \
-            else self.__loaded_item["work_materials"]
-        materials = self.__materials_dict if len(self.__materials_dict) > 0 else self.__loaded_item["materials"]
-        production_steps = self.__steps_dict if len(self.__steps_dict) > 0 else self.__loaded_item["production_steps"]
-        data = self.__render_temp_dict(
-            self.__prepare_data_list(
-                name if name else self.__loaded_item["name"],
-                time if time else self.__loaded_item["time"],
-                work_materials,
-                materials,
-                material_cost if material_cost else self.__loaded_item["material_cost"],
-                sell_cost if sell_cost else self.__loaded_item["sell_cost"],
-                production_steps,
-                ad_info if ad_info else self.__loaded_item["ad_info"]
-            ),
-            self.__item_struct
-        )
-        self.json_update.update_json(self.__render_json_id(json_id), data)
-        self.clean_dicts()
+    def __getitem__(self, json_key: str):
+        attribute = self.attributes.get(json_key)
+        if attribute:
+            return getattr(self, attribute)
+        if self.extra and json_key in self.extra:
+            return self.extra[json_key]
+        raise KeyError(json_key)
 
-    def delete_item(self, json_id: int):
-        """
-        Deletes given item from json file.
-        :param json_id: json ID
-        :return: Nothing
-        """
-        self.json_update.delete_from_json(self.__render_json_id(json_id))
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_json() == other.to_json()
 
-    # region Materials
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_json()})"
 
-    def add_materials(self, *data: list):
-        """
-        Adds all materials data from list to dict.
-        :param list data: lists with material data
-        :return: Nothing
-        """
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # JSON key -> attribute name
+        cls.attributes = dict(cls.fields)
+
+
+class Material(Record):
+
+    __slots__ = ("id", "material", "size", "number_of", "time_for")
+    fields = (
+        ("id", "id"),
+        ("material", "material"),
+        ("size", "size"),
+        ("number_of", "number_of"),
+        ("time_for", "time_for")
+    )
+
+
+class WorkMaterial(Record):
+
+    __slots__ = ("id", "material", "size", "number_of", "cost")
+    fields = (
+        ("id", "id"),
+        ("material", "material"),
+        ("size", "size"),
+        ("number_of", "number_of"),
+        ("cost", "cost")
+    )
+
+
+class Step(Record):
+
+    __slots__ = ("id", "step", "time")
+    fields = (
+        ("id", "id"),
+        ("step", "step"),
+        ("time", "time")
+    )
+
+
+class Item(Record):
+
+    __slots__ = ("name", "time", "work_materials", "materials", "material_cost", "sell_cost",
+                 "production_steps", "ad_info")
+    fields = (
+        ("name", "name"),
+        ("time", "time"),
+        ("work_materials", "work_materials"),
+        ("materials", "materials"),
+        ("material_cost", "material_cost"),
+        ("sell_cost", "sell_cost"),
+        ("production_steps", "production_steps"),
+        ("ad_info", "ad_info")
+    )
+    nested = {
+        "work_materials": WorkMaterial,
+        "materials": Material,
+        "production_steps": Step
+    }
+
+
+class Task(Record):
+
+    __slots__ = ("item_id", "item_name", "serial_number", "fv", "date", "sell_cost", "time_days",
+                 "time_hours", "ad_info")
+    fields = (
+        ("item_id", "item_id"),
+        ("item_name", "item_name"),
+        ("s/n", "serial_number"),
+        ("fv", "fv"),
+        ("date", "date"),
+        ("sell_cost", "sell_cost"),
+        ("time_days", "time_days"),
+        ("time_hours", "time_hours"),
+        ("ad_info", "ad_info")
+    )
+    date_format = "%d.%m.%y"
+
+    @classmethod
+    def parse_date(cls, value: str):
+        """
+        Changes task date like "29.02.24" into date object.
+        :param str value: date written like in json file
+        :return: date object, None for missing or wrong date
+        """
+        try:
+            return datetime.strptime(value, cls.date_format).date()
+        except (TypeError, ValueError):
+            return None
+
+
+class ItemStore:
+
+    __json_id_prefix = "id_"
+    record_classes = {"Items": Item, "Tasks": Task}
+    # Shared stores: section name -> (loaded file dict, ItemStore)
+    __stores = {}
+
+    def __init__(self, section_dict: dict, record_class):
+        """
+        Builds store, records of section dict are replaced with record objects.
+        :param dict section_dict: section of loaded file
+        :param record_class: Item/Task
+        """
+        self.__records = {}
+        self.__ids = []
+        # Secondary indexes updated with every change: index class -> index, see TaskIndex.for_store
+        self.indexes = {}
+        for json_id, record in section_dict.items():
+            if not isinstance(record, Record):
+                record = record_class.from_json(record)
+                section_dict[json_id] = record
+            self.__records[self.parse_json_id(json_id)] = record
+        self.__ids = sorted(self.__records)
+
+    # region Public methods
+
+    @classmethod
+    def for_section(cls, file_data: dict, section: str):
+        """
+        Returns store for section of loaded file. Store is built once for every loaded file.
+        :param dict file_data: loaded file
+        :param str section: Items/Tasks
+        :return: ItemStore object
+        """
+        with BaseReader.document_lock:
+            cached = cls.__stores.get(section)
+            if cached and cached[0] is file_data:
+                return cached[1]
+            store = cls(file_data.setdefault(section, {}), cls.record_classes[section])
+            cls.__stores[section] = (file_data, store)
+            return store
+
+    @classmethod
+    def parse_json_id(cls, json_id: str):
+        """
+        Changes JSON id data into int.
+        :param str json_id: JSON id like "id_1"
+        :return: int item/task id
+        """
+        return int(json_id[len(cls.__json_id_prefix):])
+
+    @classmethod
+    def render_json_id(cls, item_id: int):
+        """
+        Generates item id writen like in json file
+        :param int item_id: int value of json id
+        :return: str json id
+        """
+        return cls.__json_id_prefix + str(item_id)
+
+    def get(self, item_id: int):
+        """
+        Returns record for given id.
+        :param int item_id: item/task id
+        :return: Item/Task record or None
+        """
+        return self.__records.get(item_id)
+
+    def upsert(self, item_id: int, record: dict):
+        """
+        Adds or replaces record.
+        :param int item_id: item/task id
+        :param Record record: Item/Task record
+        :return: Nothing
+        """
+        if item_id not in self.__records:
+            if not self.__ids or item_id > self.__ids[-1]:
+                self.__ids.append(item_id)
+            else:
+                insort(self.__ids, item_id)
+        self.__records[item_id] = record
+        for index in self.indexes.values():
+            index.add(item_id, record)
+
+    def delete(self, item_id: int):
+        """
+        Deletes record.
+        :param int item_id: item/task id
+        :return: Nothing
+        """
+        if self.__records.pop(item_id, None) is not None:
+            del self.__ids[bisect_left(self.__ids, item_id)]
+            for index in self.indexes.values():
+                index.remove(item_id)
+
+    def ids(self):
+        """
+        Returns sorted ids.
+        :return: list of int ids
+        """
+        return list(self.__ids)
+
+    def items(self):
+        """
+        Returns records sorted by id.
+        :return: generator of (id, record) pairs
+        """
+        return ((item_id, self.__records[item_id]) for item_id in self.__ids)
+
+    def last_id(self):
+        """
+        Returns highest id.
+        :return: int highest id, -1 for empty store
+        """
+        return self.__ids[-1] if self.__ids else -1
+
+    def next_id(self):
+        """
+        Returns id for new record.
+        :return: int new id
+        """
+        return self.last_id() + 1
+
+    def __len__(self):
+        return len(self.__records)
+
+    def __contains__(self, item_id: int):
+        return item_id in self.__records
+
+    # endregion
+
+
+class JsonStreamReader:
+
+    __chunk_size = 65536
+    __whitespace = " \t\n\r"
+
+    def __init__(self, file_name: str = None):
+        self.base = BaseReader()
+        self.file_name = file_name if file_name else self.base.library_file_name
+        self.__decoder = json.JSONDecoder()
+        self.__file = None
+        self.__buffer = ""
+        self.__position = 0
+        self.__end_of_file = False
+
+    # region Public methods
+
+    def iterate_records(self, sections: tuple = None):
+        """
+        Reads json file record by record, only one record is kept in memory.
+        Journal changes are applied, so result is the same as from DataReader.
+        :param tuple sections: Items/Tasks sections to read, all if not given
+        :return: generator of (section, int id, Item/Task record) tuples
+        """
+        journal = {}
+        for entry in self.base.read_journal(self.file_name):
+            journal[(entry["section"], entry["id"])] = entry["data"]
+        for section, json_id, data in self.__iterate_file(sections):
+            if (section, json_id) in journal:
+                data = journal.pop((section, json_id))
+                if data is None:
+                    continue
+            yield section, ItemStore.parse_json_id(json_id), ItemStore.record_classes[section].from_json(data)
+        for (section, json_id), data in journal.items():
+            if data is not None and section in ItemStore.record_classes and (not sections or section in sections):
+                yield section, ItemStore.parse_json_id(json_id), ItemStore.record_classes[section].from_json(data)
+
+    # endregion
+    # region Private methods
+
+    def __iterate_file(self, sections: tuple = None):
+        """
+        Parses top level of json file and yields records of Items/Tasks sections.
+        :param tuple sections: sections to yield, all if not given
+        :return: generator of (section, json id, record dict) tuples
+        """
+        with open(self.file_name, "r", encoding="utf-8") as file:
+            self.__file = file
+            self.__buffer = ""
+            self.__position = 0
+            self.__end_of_file = False
+            self.__expect("{")
+            if self.__peek() == "}":
+                return
+            while True:
+                section = self.__read_value()
+                self.__expect(":")
+                if section in ItemStore.record_classes and self.__peek() == "{":
+                    self.__expect("{")
+                    if self.__peek() == "}":
+                        self.__expect("}")
+                    else:
+                        while True:
+                            json_id = self.__read_value()
+                            self.__expect(":")
+                            record = self.__read_value()
+                            if not sections or section in sections:
+                                yield section, json_id, record
+                            if self.__read_separator() == "}":
+                                break
+                else:
+                    self.__read_value()
+                if self.__read_separator() == "}":
+                    return
+
+    def __fill_buffer(self):
+        """
+        Reads next chunk of file, already parsed part of buffer is dropped.
+        :return: False if file has ended
+        """
+        if self.__end_of_file:
+            return False
+        self.__buffer = self.__buffer[self.__position:]
+        self.__position = 0
+        chunk = self.__file.read(self.__chunk_size)
+        if not chunk:
+            self.__end_of_file = True
+            return False
+        self.__buffer += chunk
+        return True
+
+    def __peek(self):
+        """
+        Skips whitespaces and returns next char.
+        :return: str next char
+        """
+        while True:
+            while self.__position < len(self.__buffer) and self.__buffer[self.__position] in self.__whitespace:
+                self.__position += 1
+            if self.__position < len(self.__buffer):
+                return self.__buffer[self.__position]
+            if not self.__fill_buffer():
+                raise json.JSONDecodeError("Unexpected end of file", self.__buffer, self.__position)
+
+    def __expect(self, char: str):
+        """
+        Reads given char.
+        :param str char: expected char
+        :return: Nothing
+        """
+        if self.__peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.__buffer, self.__position)
+        self.__position += 1
+
+    def __read_separator(self):
+        """
+        Reads comma or end of object.
+        :return: str read char
+        """
+        char = self.__peek()
+        if char not in ",}":
+            raise json.JSONDecodeError("Expecting ',' or '}'", self.__buffer, self.__position)
+        self.__position += 1
+        return char
+
+    def __read_value(self):
+        """
+        Decodes next JSON value, file is read until value is complete.
+        :return: decoded value
+        """
+        self.__peek()
+        while True:
+            try:
+                value, end = self.__decoder.raw_decode(self.__buffer, self.__position)
+            except json.JSONDecodeError:
+                if not self.__fill_buffer():
+                    raise
+                continue
+            # Number at the end of buffer can continue in next chunk
+            if end == len(self.__buffer) and self.__fill_buffer():
+                continue
+            self.__position = end
+            return value
+
+    # endregion
+
+
+class TaskArchive:
+
+    # Layout: header, column names, fixed-width rows sorted by id, string table.
+    # Row is task id and string table offset of every column, strings keep JSON encoded values.
+    __magic = b"DOLA"
+    __format_version = 1
+    __header = struct.Struct("<4sHHII")
+    __offset = struct.Struct("<I")
+    __empty_offset = 0xFFFFFFFF
+    __extra_column = "extra"
+    # Opened archives: file name -> (file stamp, mmap), mapping is closed when last reader holding it is gone
+    __mappings = {}
+
+    def __init__(self, file_name: str = None):
+        self.base = BaseReader()
+        self.file_name = file_name if file_name else EngineConfigReader().return_archive_file_name()
+        self.columns = [json_key for json_key, attribute in Task.fields] + [self.__extra_column]
+        self.__data = None
+        self.__count = 0
+        self.__rows_offset = 0
+        self.__strings_offset = 0
+        self.__file_columns = self.columns
+        self.__row = struct.Struct("<I" + "I" * len(self.columns))
+        self.stamp = None
+        self.__open()
+
+    # region Public methods
+
+    def get(self, task_id: int):
+        """
+        Reads archived task, only its row and strings are decoded.
+        :param int task_id: task id
+        :return: Task record or None
+        """
+        self.refresh()
+        position = self.__find(task_id)
+        if position is None:
+            return None
+        return self.__read_record(position)
+
+    def ids(self):
+        """
+        Returns sorted ids of archived tasks.
+        :return: list of int ids
+        """
+        self.refresh()
+        return [self.__read_id(position) for position in range(self.__count)]
+
+    def items(self):
+        """
+        Returns archived tasks sorted by id.
+        :return: generator of (id, Task record) pairs
+        """
+        self.refresh()
+        return ((self.__read_id(position), self.__read_record(position)) for position in range(self.__count))
+
+    def last_id(self):
+        """
+        Returns highest archived id.
+        :return: int highest id, -1 for empty archive
+        """
+        self.refresh()
+        return self.__read_id(self.__count - 1) if self.__count else -1
+
+    def archive_tasks(self, before: str = None):
+        """
+        Moves tasks older than given date from library into archive.
+        Archive is written before tasks are deleted, so interrupted run never loses tasks.
+        :param str before: date like "01.01.24", taken from config if not given
+        :return: int number of archived tasks
+        """
+        before = before if before else EngineConfigReader().return_archive_before()
+        before_date = Task.parse_date(before)
+        if before_date is None:
+            raise ValueError(f"Wrong archive date: {before!r}, expected format like 01.01.24")
+        json_update = UpdateJson(False)
+        with json_update.locked():
+            store = ItemStore.for_section(self.base.load_library(), "Tasks")
+            moved = {}
+            for task_id, record in store.items():
+                date = Task.parse_date(record.date)
+                if date is not None and date < before_date:
+                    moved[task_id] = record
+            if not moved:
+                return 0
+            archived = dict(self.items())
+            archived.update(moved)
+            self.write(archived)
+            json_update.delete_many_from_json([ItemStore.render_json_id(task_id) for task_id in moved],
+                                              notify=False)
+        # Rows stay visible, they are read from archive now
+        ChangeNotifier.notify("Tasks", ChangeNotifier.update_change, sorted(moved))
+        return len(moved)
+
+    def refresh(self):
+        """
+        Opens archive again when its file changed since it was opened, like load_json checks its files.
+        Called by every read, so reader created before archive_tasks sees archived tasks.
+        :return: Nothing
+        """
+        try:
+            file_stat = stat(self.file_name)
+            stamp = (file_stat.st_mtime_ns, file_stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp != self.stamp:
+            self.__open()
+
+    def write(self, records: dict):
+        """
+        Replaces archive file with given tasks.
+        :param dict records: int id -> Task record
+        :return: Nothing
+        """
+        strings = {}
+        string_table = bytearray()
+        rows = bytearray()
+        for task_id in sorted(records):
+            data = records[task_id].to_json()
+            values = [data.pop(json_key, None) for json_key in self.columns[:-1]]
+            values.append(data if data else None)
+            offsets = []
+            for value in values:
+                if value is None:
+                    offsets.append(self.__empty_offset)
+                    continue
+                encoded = json.dumps(value, ensure_ascii=False).encode("utf-8")
+                if encoded not in strings:
+                    strings[encoded] = len(string_table)
+                    string_table += self.__offset.pack(len(encoded)) + encoded
+                offsets.append(strings[encoded])
+            rows += self.__row.pack(task_id, *offsets)
+        column_names = bytearray()
+        for column in self.columns:
+            encoded = column.encode("utf-8")
+            column_names += self.__offset.pack(len(encoded)) + encoded
+        rows_offset = self.__header.size + len(column_names)
+        header = self.__header.pack(self.__magic, self.__format_version, len(self.columns),
+                                    len(records), rows_offset + len(rows))
+        self.__data = None
+        self.__close(self.file_name)
+        self.base.atomic_write(self.file_name, bytes(header + column_names + rows + string_table),
+                               EngineConfigReader().return_fsync_directory())
+        self.__open()
+
+    def __len__(self):
+        self.refresh()
+        return self.__count
+
+    def __contains__(self, task_id: int):
+        self.refresh()
+        return self.__find(task_id) is not None
+
+    # endregion
+    # region Private methods
+
+    def __open(self):
+        """
+        Maps archive file into memory, mapping is shared until file changes.
+        Readers opened before keep old mapping, it stays valid after file is replaced.
+        :return: Nothing
+        """
+        try:
+            file_stat = stat(self.file_name)
+        except FileNotFoundError:
+            self.__data = None
+            self.__count = 0
+            self.stamp = None
+            return
+        stamp = (file_stat.st_mtime_ns, file_stat.st_size)
+        self.stamp = stamp
+        cached = self.__mappings.get(self.file_name)
+        if not cached or cached[0] != stamp:
+            self.__close(self.file_name)
+            with open(self.file_name, "rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            cached = (stamp, data)
+            self.__mappings[self.file_name] = cached
+        self.__data = cached[1]
+        magic, version, column_count, self.__count, self.__strings_offset = self.__header.unpack_from(self.__data)
+        if magic != self.__magic or version != self.__format_version:
+            raise ValueError(f"{self.file_name} is not tasks archive or has unknown version")
+        position = self.__header.size
+        columns = []
+        for _ in range(column_count):
+            length = self.__offset.unpack_from(self.__data, position)[0]
+            columns.append(self.__data[position + self.__offset.size:position + self.__offset.size + length].decode())
+            position += self.__offset.size + length
+        self.__file_columns = columns
+        self.__row = struct.Struct("<I" + "I" * column_count)
+        self.__rows_offset = position
+
+    @classmethod
+    def __close(cls, file_name: str):
+        """
+        Drops shared mapping of file. Mapping is not closed here, other readers may still use it,
+        mmap closes it itself when last of them is gone.
+        :param str file_name: archive file name
+        :return: Nothing
+        """
+        cls.__mappings.pop(file_name, None)
+
+    def __find(self, task_id: int):
+        """
+        Binary search over fixed-width rows.
+        :param int task_id: task id
+        :return: int row position or None
+        """
+        low, high = 0, self.__count
+        while low < high:
+            middle = (low + high) // 2
+            if self.__read_id(middle) < task_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.__count and self.__read_id(low) == task_id:
+            return low
+        return None
+
+    def __read_id(self, position: int):
+        """
+        Reads task id of row.
+        :param int position: row position
+        :return: int task id
+        """
+        return self.__offset.unpack_from(self.__data, self.__rows_offset + position * self.__row.size)[0]
+
+    def __read_record(self, position: int):
+        """
+        Decodes row into task record.
+        :param int position: row position
+        :return: Task record
+        """
+        row = self.__row.unpack_from(self.__data, self.__rows_offset + position * self.__row.size)
+        data = {}
+        for column, offset in zip(self.__file_columns, row[1:]):
+            value = self.__read_string(offset)
+            if column == self.__extra_column:
+                data.update(value or {})
+            else:
+                data[column] = value
+        return Task.from_json(data)
+
+    def __read_string(self, offset: int):
+        """
+        Reads JSON encoded value from string table.
+        :param int offset: offset in string table
+        :return: decoded value, None for empty offset
+        """
+        if offset == self.__empty_offset:
+            return None
+        position = self.__strings_offset + offset
+        length = self.__offset.unpack_from(self.__data, position)[0]
+        position += self.__offset.size
+        return json.loads(self.__data[position:position + length].decode("utf-8"))
+
+    # endregion
+
+
+class TaskIndex:
+
+    # Archive indexes: archive file name -> (file stamp, TaskIndex)
+    __archive_indexes = {}
+
+    def __init__(self, records):
+        """
+        Builds indexes, they keep task ids only.
+        :param records: iterable of (id, Task record) pairs
+        """
+        # Hash indexes: item id / serial number -> sorted task ids
+        self.__by_item = {}
+        self.__by_serial = {}
+        # Sorted index: (date, task id) pairs, tasks without proper date are skipped
+        self.__by_date = []
+        # Task id -> indexed (item id, serial number, date), needed to remove old keys
+        self.__keys = {}
+        for task_id, record in records:
+            date = Task.parse_date(record.date)
+            self.__keys[task_id] = (record.item_id, record.serial_number, date)
+            self.__by_item.setdefault(record.item_id, []).append(task_id)
+            self.__by_serial.setdefault(record.serial_number, []).append(task_id)
+            if date is not None:
+                self.__by_date.append((date, task_id))
+        for ids in (*self.__by_item.values(), *self.__by_serial.values(), self.__by_date):
+            ids.sort()
+
+    # region Public methods
+
+    @classmethod
+    def for_store(cls, store: ItemStore):
+        """
+        Returns index of tasks store, index is built once and updated by every store change.
+        :param ItemStore store: tasks store
+        :return: TaskIndex object
+        """
+        with BaseReader.document_lock:
+            if cls not in store.indexes:
+                store.indexes[cls] = cls(store.items())
+            return store.indexes[cls]
+
+    @classmethod
+    def for_archive(cls, archive: TaskArchive):
+        """
+        Returns index of archived tasks, index is built again only when archive file changes.
+        :param TaskArchive archive: opened archive
+        :return: TaskIndex object
+        """
+        archive.refresh()
+        cached = cls.__archive_indexes.get(archive.file_name)
+        if cached and cached[0] == archive.stamp:
+            return cached[1]
+        index = cls(archive.items())
+        cls.__archive_indexes[archive.file_name] = (archive.stamp, index)
+        return index
+
+    def add(self, task_id: int, record: Task):
+        """
+        Adds task to indexes, old keys of replaced task are removed.
+        :param int task_id: task id
+        :param Task record: task record
+        :return: Nothing
+        """
+        if task_id in self.__keys:
+            self.remove(task_id)
+        date = Task.parse_date(record.date)
+        self.__keys[task_id] = (record.item_id, record.serial_number, date)
+        insort(self.__by_item.setdefault(record.item_id, []), task_id)
+        insort(self.__by_serial.setdefault(record.serial_number, []), task_id)
+        if date is not None:
+            insort(self.__by_date, (date, task_id))
+
+    def remove(self, task_id: int):
+        """
+        Removes task from indexes.
+        :param int task_id: task id
+        :return: Nothing
+        """
+        keys = self.__keys.pop(task_id, None)
+        if keys is None:
+            return
+        item_id, serial_number, date = keys
+        self.__remove_id(self.__by_item, item_id, task_id)
+        self.__remove_id(self.__by_serial, serial_number, task_id)
+        if date is not None:
+            del self.__by_date[bisect_left(self.__by_date, (date, task_id))]
+
+    def ids_for_item(self, item_id: int):
+        """
+        Returns tasks made for given item.
+        :param int item_id: item id
+        :return: sorted list of int task ids
+        """
+        return list(self.__by_item.get(item_id, ()))
+
+    def ids_for_serial(self, serial_number: str):
+        """
+        Returns tasks with given serial number.
+        :param str serial_number: serial number
+        :return: sorted list of int task ids
+        """
+        return list(self.__by_serial.get(serial_number, ()))
+
+    def ids_between(self, first_date, last_date):
+        """
+        Returns tasks dated between given dates, both dates are included.
+        :param first_date: date object
+        :param last_date: date object
+        :return: list of (date, int task id) pairs sorted by date
+        """
+        start = bisect_left(self.__by_date, (first_date, -1))
+        end = bisect_left(self.__by_date, (last_date, float("inf")))
+        return self.__by_date[start:end]
+
+    # endregion
+    # region Private methods
+
+    @staticmethod
+    def __remove_id(index: dict, key, task_id: int):
+        """
+        Removes task id from hash index, empty keys are dropped.
+        :param dict index: hash index
+        :param key: indexed value
+        :param int task_id: task id
+        :return: Nothing
+        """
+        ids = index[key]
+        del ids[bisect_left(ids, task_id)]
+        if not ids:
+            del index[key]
+
+    # endregion
+
+
+class ItemSearchIndex:
+
+    # Letters without unicode decomposition
+    __folded_letters = str.maketrans({"ł": "l", "Ł": "l", "ß": "ss"})
+    __token_pattern = re.compile(r"\w+")
+    __combining_pattern = re.compile("[\u0300-\u036f]")
+
+    def __init__(self, records):
+        """
+        Builds inverted index over item names, ad info, material names and step descriptions.
+        :param records: iterable of (id, Item record) pairs
+        """
+        # Word -> ids of items containing it
+        self.__postings = {}
+        # Sorted distinct words, used for prefix search
+        self.__words = []
+        # Item id -> indexed words, needed to remove old words
+        self.__item_words = {}
+        for item_id, record in records:
+            words = self.__record_words(record)
+            self.__item_words[item_id] = words
+            for word in words:
+                self.__postings.setdefault(word, set()).add(item_id)
+        self.__words = sorted(self.__postings)
+
+    # region Public methods
+
+    @classmethod
+    def for_store(cls, store: ItemStore):
+        """
+        Returns search index of items store, index is built once and updated by every store change.
+        :param ItemStore store: items store
+        :return: ItemSearchIndex object
+        """
+        with BaseReader.document_lock:
+            if cls not in store.indexes:
+                store.indexes[cls] = cls(store.items())
+            return store.indexes[cls]
+
+    @classmethod
+    def normalize(cls, text: str):
+        """
+        Lowers text and removes diacritics, "Cięcie" and "ciecie" give the same result.
+        :param str text: text to normalize
+        :return: str normalized text
+        """
+        text = text.lower()
+        if text.isascii():
+            return text
+        text = unicodedata.normalize("NFKD", text.translate(cls.__folded_letters))
+        return cls.__combining_pattern.sub("", text)
+
+    @classmethod
+    def split_words(cls, text: str):
+        """
+        Splits text into normalized words.
+        :param str text: text to split
+        :return: list of str words
+        """
+        return cls.__token_pattern.findall(cls.normalize(text))
+
+    def add(self, item_id: int, record: Item):
+        """
+        Adds item to index, words of replaced item are removed.
+        :param int item_id: item id
+        :param Item record: item record
+        :return: Nothing
+        """
+        self.remove(item_id)
+        words = self.__record_words(record)
+        self.__item_words[item_id] = words
+        for word in words:
+            if word not in self.__postings:
+                self.__postings[word] = set()
+                insort(self.__words, word)
+            self.__postings[word].add(item_id)
+
+    def remove(self, item_id: int):
+        """
+        Removes item from index.
+        :param int item_id: item id
+        :return: Nothing
+        """
+        for word in self.__item_words.pop(item_id, ()):
+            ids = self.__postings[word]
+            ids.discard(item_id)
+            if not ids:
+                del self.__postings[word]
+                del self.__words[bisect_left(self.__words, word)]
+
+    def search(self, text: str):
+        """
+        Finds items containing all words of text, last word may be unfinished.
+        :param str text: searched text
+        :return: sorted list of int item ids
+        """
+        words = self.split_words(text)
+        if not words:
+            return []
+        result = None
+        # Longest words first, they usually match the fewest items
+        for word in sorted(set(words), key=len, reverse=True):
+            ids = self.__prefix_ids(word)
+            result = ids if result is None else result & ids
+            if not result:
+                return []
+        return sorted(result)
+
+    # endregion
+    # region Private methods
+
+    def __prefix_ids(self, prefix: str):
+        """
+        Returns ids of items containing word starting with prefix.
+        :param str prefix: normalized word prefix
+        :return: set of int item ids
+        """
+        position = bisect_left(self.__words, prefix)
+        ids = set()
+        while position < len(self.__words) and self.__words[position].startswith(prefix):
+            ids |= self.__postings[self.__words[position]]
+            position += 1
+        return ids
+
+    @classmethod
+    def __record_words(cls, record: Item):
+        """
+        Collects words of searched item fields.
+        :param Item record: item record
+        :return: set of str words
+        """
+        texts = [record.name, record.ad_info]
+        for nested in (record.materials, record.work_materials):
+            texts.extend(material.material for material in (nested or {}).values())
+        texts.extend(step.step for step in (record.production_steps or {}).values())
+        return set(cls.split_words("\n".join(text for text in texts if isinstance(text, str))))
+
+    # endregion
+
+
+class ItemRollup:
+
+    # Computed columns, they can be used in treeview values_to_read like JSON keys
+    column_names = ("computed_material_cost", "computed_time", "margin")
+    # numpy module, None when it is not installed, False before first check
+    __numpy = False
+    # Smallest numpy column capacity, columns can be longer than number of items, values are read by position
+    __min_capacity = 16
+
+    def __init__(self, records):
+        """
+        Computes material cost, production time and margin of all items in one batched pass.
+        Nested records are flattened into columns first, totals are summed per item by its position.
+        :param records: iterable of (id, Item record) pairs
+        """
+        self.__positions = {}
+        self.__ids = []
+        cost_owners, costs, counts = [], [], []
+        time_owners, times = [], []
+        sell_costs = []
+        for position, (item_id, record) in enumerate(records):
+            self.__positions[item_id] = position
+            self.__ids.append(item_id)
+            for work_material in (record.work_materials or {}).values():
+                cost_owners.append(position)
+                costs.append(self.__number(work_material.cost))
+                counts.append(self.__number(work_material.number_of))
+            for nested, attribute in ((record.materials, "time_for"), (record.production_steps, "time")):
+                for nested_record in (nested or {}).values():
+                    time_owners.append(position)
+                    times.append(self.__number(getattr(nested_record, attribute)))
+            sell_costs.append(self.__number(record.sell_cost))
+        numpy = self.__load_numpy()
+        size = len(self.__ids)
+        if numpy:
+            material_cost = numpy.bincount(numpy.array(cost_owners, dtype=numpy.intp),
+                                           weights=numpy.array(costs) * numpy.array(counts), minlength=size)
+            time = numpy.bincount(numpy.array(time_owners, dtype=numpy.intp),
+                                  weights=numpy.array(times), minlength=size)
+            sell_cost = numpy.array(sell_costs, dtype=float)
+            margin = sell_cost - material_cost
+        else:
+            material_cost = array("d", bytes(8 * size))
+            time = array("d", bytes(8 * size))
+            for position, cost, count in zip(cost_owners, costs, counts):
+                material_cost[position] += cost * count
+            for position, value in zip(time_owners, times):
+                time[position] += value
+            sell_cost = array("d", sell_costs)
+            margin = array("d", map(float.__sub__, sell_cost, material_cost))
+        self.columns = {
+            "computed_material_cost": material_cost,
+            "computed_time": time,
+            "margin": margin,
+            "sell_cost": sell_cost
+        }
+
+    # region Public methods
+
+    @classmethod
+    def for_store(cls, store: ItemStore):
+        """
+        Returns rollup of items store, it is computed once and updated by every store change.
+        :param ItemStore store: items store
+        :return: ItemRollup object
+        """
+        with BaseReader.document_lock:
+            if cls not in store.indexes:
+                store.indexes[cls] = cls(store.items())
+            return store.indexes[cls]
+
+    def add(self, item_id: int, record: Item):
+        """
+        Computes values of single edited or added item.
+        :param int item_id: item id
+        :param Item record: item record
+        :return: Nothing
+        """
+        material_cost = sum(self.__number(work_material.cost) * self.__number(work_material.number_of)
+                            for work_material in (record.work_materials or {}).values())
+        time = sum(self.__number(material.time_for) for material in (record.materials or {}).values()) + \
+            sum(self.__number(step.time) for step in (record.production_steps or {}).values())
+        sell_cost = self.__number(record.sell_cost)
+        values = {
+            "computed_material_cost": material_cost,
+            "computed_time": time,
+            "margin": sell_cost - material_cost,
+            "sell_cost": sell_cost
+        }
+        position = self.__positions.get(item_id)
+        if position is None:
+            position = len(self.__ids)
+            self.__positions[item_id] = position
+            self.__ids.append(item_id)
+            numpy = self.__load_numpy()
+            for name, value in values.items():
+                if not numpy:
+                    self.columns[name].append(value)
+                    continue
+                column = self.columns[name]
+                if position >= len(column):
+                    # Capacity is doubled, so adding many items copies columns only log(n) times
+                    grown = numpy.zeros(max(2 * len(column), self.__min_capacity))
+                    grown[:len(column)] = column
+                    self.columns[name] = column = grown
+                column[position] = value
+            return
+        for name, value in values.items():
+            self.columns[name][position] = value
+
+    def remove(self, item_id: int):
+        """
+        Drops item, its position is left unused.
+        :param int item_id: item id
+        :return: Nothing
+        """
+        position = self.__positions.pop(item_id, None)
+        if position is not None:
+            self.__ids[position] = None
+
+    def get(self, item_id: int, column: str):
+        """
+        Returns computed value of item.
+        :param int item_id: item id
+        :param str column: one of column_names
+        :return: float value or None for unknown item
+        """
+        position = self.__positions.get(item_id)
+        if position is None:
+            return None
+        return float(self.columns[column][position])
+
+    def return_column(self, column: str):
+        """
+        Returns computed values of all items.
+        :param str column: one of column_names or sell_cost
+        :return: dict int id -> float value
+        """
+        values = self.columns[column]
+        return {item_id: float(values[position]) for item_id, position in self.__positions.items()}
+
+    # endregion
+    # region Private methods
+
+    @classmethod
+    def __load_numpy(cls):
+        """
+        Imports numpy at first use, it is optional.
+        :return: numpy module or None
+        """
+        if cls.__numpy is False:
+            try:
+                import numpy
+            except ImportError:
+                numpy = None
+            cls.__numpy = numpy
+        return cls.__numpy
+
+    @staticmethod
+    def __number(value):
+        """
+        Changes typed in value into float, missing and "default" values count as 0.
+        :param value: value from record
+        :return: float value
+        """
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0.0
+
+    # endregion
+
+
+class TaskAnalytics:
+
+    granularities = ("day", "week", "month", "item")
+    # Granularities reported in date range, their periods are kept sorted
+    period_granularities = ("day", "week", "month")
+    measures = ("revenue", "cost", "profit", "hours", "tasks")
+    # Task time_days is counted in working days
+    work_day_hours = 8
+
+    def __init__(self, records, rollup: ItemRollup, archive_stamp=None):
+        """
+        Builds cube of task measures summed per day, week, month and item.
+        :param records: iterable of (id, Task record) pairs
+        :param ItemRollup rollup: items rollup, task cost is material cost of its item
+        :param archive_stamp: stamp of archive included in records
+        """
+        self.rollup = rollup
+        self.archive_stamp = archive_stamp
+        # Granularity -> period or item id -> list of measures
+        self.__cube = {granularity: {} for granularity in self.granularities}
+        # Granularity -> sorted periods of its cells, date range is found by bisect
+        self.__periods = {granularity: [] for granularity in self.period_granularities}
+        # Task id -> (cube keys, measures) added by task, needed to remove it
+        self.__tasks = {}
+        # Item id -> ids of tasks made for it, needed to reprice tasks after item change
+        self.__item_tasks = {}
+        self.__records = {}
+        self.items_listener = _TaskAnalyticsItemsListener(self)
+        for task_id, record in records:
+            self.add(task_id, record)
+
+    # region Public methods
+
+    @classmethod
+    def for_store(cls, store: ItemStore, archive: TaskArchive, items_store: ItemStore):
+        """
+        Returns cube of tasks store and archive. Cube is updated by every task and item change
+        and built again only when archive or items store is replaced.
+        :param ItemStore store: tasks store
+        :param TaskArchive archive: archived tasks
+        :param ItemStore items_store: items store
+        :return: TaskAnalytics object
+        """
+        rollup = ItemRollup.for_store(items_store)
+        archive.refresh()
+        cube = store.indexes.get(cls)
+        if cube and cube.rollup is rollup and cube.archive_stamp == archive.stamp:
+            return cube
+        if cube:
+            for listening_store in (store, items_store):
+                listening_store.indexes.pop(cls, None)
+        archived = ((task_id, record) for task_id, record in archive.items() if task_id not in store)
+        cube = cls(merge(store.items(), archived, key=lambda pair: pair[0]), rollup, archive.stamp)
+        store.indexes[cls] = cube
+        # Registered after rollup, so item cost is already computed when tasks are repriced
+        items_store.indexes[cls] = cube.items_listener
+        return cube
+
+    def add(self, task_id: int, record: Task):
+        """
+        Adds task measures to cube, measures of replaced task are removed.
+        :param int task_id: task id
+        :param Task record: task record
+        :return: Nothing
+        """
+        self.remove(task_id)
+        revenue = self.__number(record.sell_cost)
+        cost = self.rollup.get(record.item_id, "computed_material_cost") or 0.0
+        hours = self.__number(record.time_days) * self.work_day_hours + self.__number(record.time_hours)
+        values = (revenue, cost, revenue - cost, hours, 1)
+        keys = [("item", record.item_id)]
+        date = Task.parse_date(record.date)
+        if date is not None:
+            year, week, _ = date.isocalendar()
+            keys += [("day", date.isoformat()), ("week", f"{year}-W{week:02d}"), ("month", f"{date:%Y-%m}")]
+        for key in keys:
+            self.__apply(key, values, 1)
+        self.__tasks[task_id] = (keys, values)
+        self.__records[task_id] = record
+        self.__item_tasks.setdefault(record.item_id, set()).add(task_id)
+
+    def remove(self, task_id: int):
+        """
+        Removes task measures from cube.
+        :param int task_id: task id
+        :return: Nothing
+        """
+        added = self.__tasks.pop(task_id, None)
+        if added is None:
+            return
+        keys, values = added
+        for key in keys:
+            self.__apply(key, values, -1)
+        record = self.__records.pop(task_id)
+        item_tasks = self.__item_tasks[record.item_id]
+        item_tasks.discard(task_id)
+        if not item_tasks:
+            del self.__item_tasks[record.item_id]
+
+    def reprice_item(self, item_id: int):
+        """
+        Computes again cost and profit of tasks made for changed item.
+        :param int item_id: item id
+        :return: Nothing
+        """
+        for task_id in list(self.__item_tasks.get(item_id, ())):
+            self.add(task_id, self.__records[task_id])
+
+    def return_report(self, granularity: str, first_date=None, last_date=None):
+        """
+        Returns summed measures, only cells of reported granularity and date range are read.
+        :param str granularity: day, week, month or item
+        :param first_date: date object, periods before it are skipped
+        :param last_date: date object, periods after it are skipped
+        :return: list of (period or item id, dict measure -> value) sorted by period
+        """
+        if granularity not in self.granularities:
+            raise ValueError(f"Wrong granularity: {granularity}, accepted values: {', '.join(self.granularities)}")
+        cells = self.__cube[granularity]
+        if granularity in self.__periods:
+            periods = self.__periods[granularity]
+            first_key = self.__period_key(granularity, first_date)
+            last_key = self.__period_key(granularity, last_date)
+            start = bisect_left(periods, first_key) if first_key else 0
+            end = bisect_right(periods, last_key) if last_key else len(periods)
+            return [(period, dict(zip(self.measures, cells[period]))) for period in periods[start:end]]
+        report = [(item_id, dict(zip(self.measures, values))) for item_id, values in cells.items()]
+        try:
+            return sorted(report, key=lambda row: row[0])
+        except TypeError:
+            # Tasks with missing item id
+            return sorted(report, key=lambda row: str(row[0]))
+
+    # endregion
+    # region Private methods
+
+    def __apply(self, key: tuple, values: tuple, sign: int):
+        """
+        Adds or subtracts measures of one cube cell, empty cells are dropped.
+        :param tuple key: (granularity, period or item id)
+        :param tuple values: task measures
+        :param int sign: 1 to add, -1 to subtract
+        :return: Nothing
+        """
+        granularity, period = key
+        cells = self.__cube[granularity]
+        cell = cells.get(period)
+        if cell is None:
+            cell = cells[period] = [0.0, 0.0, 0.0, 0.0, 0]
+            if granularity in self.__periods:
+                insort(self.__periods[granularity], period)
+        for position, value in enumerate(values):
+            cell[position] += sign * value
+        if not cell[-1]:
+            del cells[period]
+            if granularity in self.__periods:
+                periods = self.__periods[granularity]
+                del periods[bisect_left(periods, period)]
+
+    @staticmethod
+    def __period_key(granularity: str, date):
+        """
+        Returns cube period of date.
+        :param str granularity: day, week, month or item
+        :param date: date object or None
+        :return: str period or None
+        """
+        if date is None or granularity == "item":
+            return None
+        if granularity == "week":
+            year, week, _ = date.isocalendar()
+            return f"{year}-W{week:02d}"
+        if granularity == "month":
+            return f"{date:%Y-%m}"
+        return date.isoformat()
+
+    @staticmethod
+    def __number(value):
+        """
+        Changes typed in value into float, missing and "default" values count as 0.
+        :param value: value from record
+        :return: float value
+        """
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0.0
+
+    # endregion
+
+
+class _TaskAnalyticsItemsListener:
+
+    def __init__(self, analytics: TaskAnalytics):
+        self.analytics = analytics
+
+    def add(self, item_id: int, record: Item):
+        """
+        Reprices tasks of changed item.
+        :param int item_id: item id
+        :param Item record: item record
+        :return: Nothing
+        """
+        self.analytics.reprice_item(item_id)
+
+    def remove(self, item_id: int):
+        """
+        Reprices tasks of deleted item, their cost becomes 0.
+        :param int item_id: item id
+        :return: Nothing
+        """
+        self.analytics.reprice_item(item_id)
+
+
+class DataReader:
+
+    __id_name = "id"
+    __data_name = "data"
+    __item_type = "Items"
+    __task_type = "Tasks"
+
+    def __init__(self, item_type: bool):
+        self.data_dict = {}
+        base_reader = BaseReader()
+        # Store is built from loaded file in place, writer can not change file meanwhile
+        with base_reader.document_lock:
+            self.file = base_reader.load_library()
+            section = self.__item_type if item_type else self.__task_type
+            self.store = ItemStore.for_section(self.file, section)
+        # Archived tasks are read from archive file only when asked for
+        self.archive = TaskArchive() if not item_type else None
+
+    # region Public methods
+
+    def return_all_data(self):
+        """
+        Startup func.
+        :return: dict with all task/items sorted by int id
+        """
+        with BaseReader.document_lock:
+            self.__sort_via_id()
+        return self.data_dict
+
+    def return_data_dict(self, item_id):
+        """
+        Startup func.
+        :param int item_id: task/item id
+        :return: Item/Task record for given task/item
+        """
+        record = self.store.get(int(item_id))
+        if record is None and self.archive:
+            record = self.archive.get(int(item_id))
+        if record is None:
+            raise KeyError(ItemStore.render_json_id(item_id))
+        return record
+
+    def return_ids(self):
+        """
+        Startup func.
+        :return: sorted list of int ids
+        """
+        if not self.archive:
+            return self.store.ids()
+        # Task moved back from archive is kept in both files until next archiving
+        archived_ids = [item_id for item_id in self.archive.ids() if item_id not in self.store]
+        return list(merge(self.store.ids(), archived_ids))
+
+    def search_items(self, text: str):
+        """
+        Finds items with all words of text in name, ad info, materials or steps.
+        Case and Polish diacritics are ignored, last word may be unfinished.
+        :param str text: searched text
+        :return: sorted list of int item ids
+        """
+        if self.archive is not None:
+            raise TypeError("Search is available only for items reader")
+        with BaseReader.document_lock:
+            return ItemSearchIndex.for_store(self.store).search(text)
+
+    def return_rollup(self):
+        """
+        Returns computed material cost, production time and margin of items.
+        :return: ItemRollup object
+        """
+        if self.archive is not None:
+            raise TypeError("Rollup is available only for items reader")
+        with BaseReader.document_lock:
+            return ItemRollup.for_store(self.store)
+
+    def tasks_for_item(self, item_id: int):
+        """
+        Returns tasks made for given item, archived tasks included.
+        :param int item_id: item id
+        :return: list of Task records sorted by id
+        """
+        return [self.return_data_dict(task_id) for task_id in self.__query_ids(
+            lambda index: index.ids_for_item(item_id))]
+
+    def task_by_serial(self, serial_number: str):
+        """
+        Returns newest task with given serial number, archived tasks included.
+        :param str serial_number: serial number
+        :return: Task record or None
+        """
+        task_ids = self.__query_ids(lambda index: index.ids_for_serial(serial_number))
+        return self.return_data_dict(task_ids[-1]) if task_ids else None
+
+    def tasks_between(self, first_date, last_date):
+        """
+        Returns tasks dated between given dates, both dates are included. Archived tasks included.
+        :param first_date: date object or str date like "01.01.24"
+        :param last_date: date object or str date like "31.01.24"
+        :return: list of Task records sorted by date
+        """
+        dates = []
+        for value in (first_date, last_date):
+            date = Task.parse_date(value) if isinstance(value, str) else value
+            if date is None:
+                raise ValueError(f"Wrong date: {value!r}, expected format like 01.01.24")
+            dates.append(date)
+        pairs = self.__query_ids(lambda index: index.ids_between(*dates))
+        return [self.return_data_dict(task_id) for date, task_id in pairs]
+
+    def return_analytics(self):
+        """
+        Returns revenue, cost, profit and hours of tasks summed per day, week, month and item.
+        :return: TaskAnalytics object
+        """
+        if self.archive is None:
+            raise TypeError("Analytics are available only for tasks reader")
+        with BaseReader.document_lock:
+            return TaskAnalytics.for_store(self.store, self.archive, ItemStore.for_section(self.file, "Items"))
+
+    def return_last_id(self):
+        """
+        Startup func.
+        :return: int last id
+        """
+        if self.archive:
+            return max(self.store.last_id(), self.archive.last_id())
+        return self.store.last_id()
+
+    def return_next_id(self):
+        """
+        Returns id for new task/item, archived ids are never reused.
+        :return: int new id
+        """
+        return self.return_last_id() + 1
+
+    # endregion
+    # region Private methods
+
+    def __sort_via_id(self):
+        """
+        Collect all data from JSON sorted by ID.
+        :return: Nothing
+        """
+        self.__clean_dicts()
+        if not self.archive:
+            self.data_dict.update(self.store.items())
+            return
+        for item_id in self.return_ids():
+            self.data_dict[item_id] = self.return_data_dict(item_id)
+
+    def __query_ids(self, query):
+        """
+        Runs query on tasks index and archive index, archived ids also kept in library are skipped.
+        :param query: func taking TaskIndex and returning sorted ids or (date, id) pairs
+        :return: sorted merged list
+        """
+        if self.archive is None:
+            raise TypeError("Task queries are available only for tasks reader")
+        with BaseReader.document_lock:
+            result = query(TaskIndex.for_store(self.store))
+            if not len(self.archive):
+                return result
+            archived = query(TaskIndex.for_archive(self.archive))
+        archived = [value for value in archived
+                    if (value[1] if isinstance(value, tuple) else value) not in self.store]
+        return list(merge(result, archived))
+
+    def __clean_dicts(self):
+        """
+        Clears class dicts.
+        :return: Nothing
+        """
+        self.data_dict.clear()
+
+    # endregion
+
+
+class ItemsWriter:
+
+    __item_section_str = "Items"
+    __item_struct = {
+        "name": str,
+        "time": str,
+        "work_materials": dict,
+        "materials": dict,
+        "material_cost": float,
+        "sell_cost": float,
+        "production_steps": dict,
+        "ad_info": str
+    }
+    __material_section_str = "materials"
+    __materials_struct = {
+        "id": int,
+        "material": str,
+        "size": str,
+        "number_of": int,
+        "time_for": int
+    }
+    __work_materials_section_str = "work_materials"
+    __work_materials_struct = {
+        "id": int,
+        "material": str,
+        "size": str,
+        "number_of": int,
+        "cost": float
+    }
+    __steps_section_str = "production_steps"
+    __steps_struct = {
+        "id": int,
+        "step": str,
+        "time": int
+    }
+    __default_int = 0
+    __default_str = "N/A"
+
+    def __init__(self):
+        # Buffers of this writer, filled by add/update methods and written by add_new_item/update_item
+        self.__loaded_item = {}
+        self.__materials_dict = {}
+        self.__work_materials_dict = {}
+        self.__steps_dict = {}
+        read_base = DataReader(True)
+        self.json_update = UpdateJson(True)
+        self.last_id = read_base.return_last_id()
+        self.ids = read_base.return_ids()
+
+    # region Public Methods
+
+    @classmethod
+    def return_structs(cls):
+        """
+        Returns item struct and structs of its nested sections.
+        :return: dict section name -> dict key -> type, item struct is under "Items"
+        """
+        return {
+            cls.__item_section_str: dict(cls.__item_struct),
+            cls.__material_section_str: dict(cls.__materials_struct),
+            cls.__work_materials_section_str: dict(cls.__work_materials_struct),
+            cls.__steps_section_str: dict(cls.__steps_struct)
+        }
+
+    def clean_dicts(self,
+                    item_bool: bool = True,
+                    materials_bool: bool = True,
+                    work_materials_bool: bool = True,
+                    steps_bool: bool = True):
+        """
+        Cleans all dicts
+        :param item_bool: disables clean method
+        :param materials_bool: disables clean method
+        :param work_materials_bool: disables clean method
+        :param steps_bool: disables clean method
+        :return: Nothing
+        """
+        if item_bool:
+            self.__loaded_item.clear()
+        if materials_bool:
+            self.__materials_dict.clear()
+        if work_materials_bool:
+            self.__work_materials_dict.clear()
+        if steps_bool:
+            self.__steps_dict.clear()
+
+    def load_item(self, json_id: int):
+        """
+        Start up func. Loads json item to class variables.
+        :param json_id: json ID
+        :return: Nothing
+        """
+        self.__load_json_item(self.__render_json_id(json_id))
+
+    def add_new_item(self,
+                     name: str,
+                     time: str,
+                     material_cost: float,
+                     sell_cost: float,
+                     ad_info: str = None):
+        """
+        Adds new item to json file.
+        :param str name: name
+        :param str time: time
+        :param float material_cost: material cost
+        :param float sell_cost: prince
+        :param str ad_info: additional info
+        :return: Nothing
+        """
+        if not ad_info:
+            ad_info = self.__check_default(str)
+        # Id is reserved and written under one lock, so new item makes one write
+        with self.json_update.locked(), self.json_update.transaction():
+            self.last_id = self.json_update.reserve_ids(1)
+            data = self.__render_temp_dict(
+                self.__prepare_data_list(
+                    name,
+                    time,
+                    self.__work_materials_dict,
+                    self.__materials_dict,
+                    material_cost,
+                    sell_cost,
+                    self.__steps_dict,
+                    ad_info
+                ),
+                self.__item_struct
+            )
+            self.json_update.update_json(self.__render_json_id(self.last_id), data)
+        self.clean_dicts()
+
+    def update_item(self,
+                    json_id: int,
+                    name: str = None,
+                    time: str = None,
+                    material_cost: float = None,
+                    sell_cost: float = None,
+                    ad_info: str = None):
+        # Item is read and written under one lock, so concurrent writer or process can not change it in between
+        with self.json_update.locked():
+            self.load_item(json_id)
+            work_materials = self.__work_materials_dict \
+                if len(self.__work_materials_dict) > 0 \
+                else self.__loaded_item["work_materials"]
+            materials = self.__materials_dict if len(self.__materials_dict) > 0 else self.__loaded_item["materials"]
+            production_steps = self.__steps_dict \
+                if len(self.__steps_dict) > 0 \
+                else self.__loaded_item["production_steps"]
+            data = self.__render_temp_dict(
+                self.__prepare_data_list(
+                    name if name else self.__loaded_item["name"],
+                    time if time else self.__loaded_item["time"],
+                    work_materials,
+                    materials,
+                    material_cost if material_cost else self.__loaded_item["material_cost"],
+                    sell_cost if sell_cost else self.__loaded_item["sell_cost"],
+                    production_steps,
+                    ad_info if ad_info else self.__loaded_item["ad_info"]
+                ),
+                self.__item_struct
+            )
+            self.json_update.update_json(self.__render_json_id(json_id), data)
+        self.clean_dicts()
+
+    def delete_item(self, json_id: int):
+        """
+        Deletes given item from json file.
+        :param json_id: json ID
+        :return: Nothing
+        """
+        self.json_update.delete_from_json(self.__render_json_id(json_id))
+
+    @contextmanager
+    def batch(self):
+        """
+        Groups item, material and step changes made inside with block, they are written
+        on its end with one write and one backup. Nothing is written when block raises exception.
+        :return: Nothing
+        """
+        try:
+            with self.json_update.transaction():
+                yield self
+        except BaseException:
+            self.clean_dicts()
+            raise
+
+    # region Materials
+
+    def add_materials(self, *data: list):
+        """
+        Adds all materials data from list to dict.
+        :param list data: lists with material data
+        :return: Nothing
+        """
+        for item in data:
+            self.add_work_material(
+                item[0],
+                item[1],
+                item[2],
+                item[3]
+            )
+
+    def add_material(self, material: str, size: str, time_for: int, number_of: int = None):
+        """
+        Adds simple material to dict.
+        :param str material: material name
+        :param str size: material size
+        :param int number_of: number of material
+        :param int time_for: time spend on material
+        :return: Nothing
+        """
+        self.__update_materials_dict(
+            len(self.__materials_dict),
+            self.__render_temp_dict(
+                self.__prepare_data_list(
+                    len(self.__materials_dict),
+                    material,
+                    size,
+                    number_of if number_of else self.__check_default(int),
+                    time_for
+                ),
+                self.__materials_struct)
+        )
+
+    def update_material(self,
+                        json_id: int,
+                        material: str = None,
+                        size: str = None,
+                        time_for: int = None,
+                        number_of: int = None):
+        """
+        Updates given json id in materials dict
+        :param json_id: json ID
+        :param material: material name
+        :param size: material size
+        :param time_for: time for work with material
+        :param number_of: number of materials
+        :return: Nothing
+        """
+        material_dict = self.__load_json_section(materials_bool=True)[json_id]
+        self.__update_materials_dict(
+            json_id,
+            self.__render_temp_dict(
+                self.__prepare_data_list(
+                    json_id,
+                    material if material else material_dict["material"],
+                    size if size else material_dict["size"],
+                    time_for if time_for else material_dict["time_for"],
+                    number_of if number_of else material_dict["number_of"]
+                ),
+                self.__materials_struct
+            )
+        )
+
+    def delete_material(self, json_id: int):
+        """
+        Deletes given id from materials
+        :param json_id: json ID
+        :return: Nothing
+        """
+        self.__materials_dict = self.__load_json_section(materials_bool=True)
+        self.__materials_dict.pop(json_id)
+
+    # endregion
+    # region Work Materials
+
+    def add_work_materials(self, *data: list):
+        """
+        Adds all materials data from list to dict.
+        :param list data: lists with material data
+        :return: Nothing
+        """
         for item in data:
             self.add_work_material(
                 item[0],
@@ -530,330 +2576,1139 @@ class ItemsWriter:
                 item[3]
             )
 
-    def add_material(self, material: str, size: str, time_for: int, number_of: int = None):
+    def add_work_material(self, material: str, size: str, number_of: int = None, cost: float = None):
+        """
+        Adds simple material to dict.
+        :param str material: material name
+        :param str size: material size
+        :param int number_of: number of material
+        :param float cost: time spend on material
+        :return: Nothing
+        """
+        self.__update_work_materials_dict(
+            len(self.__work_materials_dict),
+            self.__render_temp_dict(
+                self.__prepare_data_list(
+                    len(self.__work_materials_dict),
+                    material,
+                    size,
+                    number_of if number_of else self.__check_default(int),
+                    cost if cost else self.__check_default(float)
+                ),
+                self.__work_materials_struct)
+        )
+
+    def update_work_material(self,
+                             json_id,
+                             material: str = None,
+                             size: str = None,
+                             number_of: int = None,
+                             cost: float = None):
+        """
+        Updates given json id in materials dict
+        :param json_id: json ID
+        :param material: material name
+        :param size: material size
+        :param cost: material cost
+        :param number_of: number of materials
+        :return: Nothing
+        """
+        work_material_dict = self.__load_json_section(work_materials_bool=True)[json_id]
+        self.__update_work_materials_dict(
+            json_id,
+            self.__render_temp_dict(
+                    self.__prepare_data_list(
+                        json_id,
+                        material if material else work_material_dict["material"],
+                        size if size else work_material_dict["size"],
+                        cost if cost else work_material_dict["cost"],
+                        number_of if number_of else work_material_dict["number_of"]
+                    ),
+                    self.__work_materials_struct
+                )
+        )
+
+    def delete_work_material(self, json_id: int):
+        """
+        Deletes given id from work materials
+        :param json_id: json ID
+        :return: Nothing
+        """
+        self.__work_materials_dict = self.__load_json_section(work_materials_bool=True)
+        self.__work_materials_dict.pop(json_id)
+
+    # endregion
+    # region Steps
+
+    def add_steps(self, *data: list):
+        """
+        Adds all materials data from list to dict.
+        :param list data: lists with material data
+        :return: Nothing
+        """
+        for item in data:
+            self.add_step(
+                item[0],
+                item[1]
+            )
+
+    def add_step(self, step: str, time: int):
+        """
+        Adds simple step to dict.
+        :param str step: step
+        :param int time: time spent on step
+        :return: Nothing
+        """
+        self.__update_steps_dict(
+            len(self.__steps_dict),
+            self.__render_temp_dict(
+                self.__prepare_data_list(
+                    len(self.__steps_dict),
+                    step,
+                    time
+                ),
+                self.__steps_struct)
+        )
+
+    def update_step(self, json_id, step: str = None, time: int = None):
+        """
+        Updates given json id in steps dict
+        :param json_id: json ID
+        :param step: step
+        :param time: time for step
+        :return: Nothing
+        """
+        step_dict = self.__load_json_section(steps_bool=True)[json_id]
+        self.__update_steps_dict(
+            json_id,
+            self.__render_temp_dict(
+                self.__prepare_data_list(
+                    json_id,
+                    step if step else step_dict["step"],
+                    time if time else step_dict["time"]
+                ),
+                self.__steps_struct
+            )
+        )
+
+    def delete_step(self, json_id: int):
+        """
+        Deletes given id from steps
+        :param json_id: json ID
+        :return: Nothing
+        """
+        self.__steps_dict = self.__load_json_section(steps_bool=True)
+        self.__steps_dict.pop(json_id)
+
+    # endregion
+    # endregion
+
+    # region Private Methods
+
+    # region Update dicts
+
+    def __update_materials_dict(self, last_id: int, data: dict):
+        """
+        Updates materials dict.
+        :param int last_id: last material ID
+        :param dict data: dict with material data
+        :return: Nothing
+        """
+        self.__materials_dict[str(last_id)] = data
+
+    def __update_work_materials_dict(self, last_id: int, data: dict):
+        """
+        Updates materials dict.
+        :param int last_id: last material ID
+        :param dict data: dict with material data
+        :return: Nothing
+        """
+        self.__work_materials_dict[str(last_id)] = data
+
+    def __update_steps_dict(self, last_id: int, data: dict):
+        """
+        Updates materials dict.
+        :param int last_id: last material ID
+        :param dict data: dict with material data
+        :return: Nothing
+        """
+        self.__steps_dict[str(last_id)] = data
+
+    # endregion
+
+    @staticmethod
+    def __render_temp_dict(data: list, struct: dict):
+        """
+        Renders a temporary dict from given data and for given struct.
+        :param list data: list with material data
+        :param dict struct: dict struct
+        :return: dict with correlated keys and values
+        """
+        return dict(zip(struct, data))
+
+    @classmethod
+    def __check_default(cls, variable):
+        """
+        Returns an default value for given var type.
+        :param variable: variable type
+        :return: default value
+        """
+        if variable == str:
+            return cls.__default_str
+        if variable == int:
+            return cls.__default_int
+        if variable == float:
+            return cls.__default_int
+
+    def __load_json_item(self, json_id: str):
+        """
+        Loads given item into class variable
+        :param str json_id: item id
+        :return: Nothing
+        """
+        found, record = self.json_update.return_pending(json_id)
+        if found and record is None:
+            raise KeyError(json_id)
+        if not found:
+            record = DataReader(True).return_data_dict(ItemStore.parse_json_id(json_id))
+        self.__loaded_item = record.to_json()
+
+    def __load_json_section(self,
+                            materials_bool: bool = False,
+                            work_materials_bool: bool = False,
+                            steps_bool: bool = False):
+        """
+        Returns loaded section from json dict.
+        :param materials_bool: section selector
+        :param work_materials_bool: section selector
+        :param steps_bool: section selector
+        :return:
+        """
+        section = str
+        if materials_bool:
+            section = self.__material_section_str
+        if work_materials_bool:
+            section = self.__work_materials_section_str
+        if steps_bool:
+            section = self.__steps_section_str
+        return self.__loaded_item[section]
+
+    @staticmethod
+    def __render_json_id(json_id: int):
+        """
+        Generates item id writen like in json file
+        :param int json_id: int value of json id
+        :return: str json id
+        """
+        return ItemStore.render_json_id(json_id)
+
+
+    @staticmethod
+    def __prepare_data_list(*args):
+        """
+        Creates list form given args
+        :param args: item to add
+        :return: list of given items
+        """
+        return list(args)
+
+    # endregion
+
+
+class TasksWriter:
+
+    __task_section_str = "Tasks"
+    __task_struct = {
+        "item_id": int,
+        "item_name": str,
+        "s/n": str,
+        "fv": str,
+        "date": str,
+        "sell_cost": float,
+        "time_days": int,
+        "time_hours": int,
+        "ad_info": str
+    }
+    __default_int = 0
+    __default_str = "N/A"
+
+    def __init__(self):
+        self.json_update = UpdateJson(False)
+
+    # region Public Methods
+
+    @classmethod
+    def return_struct(cls):
+        """
+        Returns task struct.
+        :return: dict key -> type
+        """
+        return dict(cls.__task_struct)
+
+    def add_task(self,
+                 item_id: int,
+                 serial_number: str,
+                 date: str,
+                 sell_cost: float = None,
+                 time_days: int = None,
+                 time_hours: int = None,
+                 fv: str = None,
+                 ad_info: str = None):
+        """
+        Adds new task made for given item, item name is copied into task.
+        :param int item_id: item id
+        :param str serial_number: serial number
+        :param str date: date like "29.02.24"
+        :param float sell_cost: price, item sell cost if not given
+        :param int time_days: days spent on task
+        :param int time_hours: hours spent on task
+        :param str fv: invoice number
+        :param str ad_info: additional info
+        :return: int new task id
+        """
+        return self.add_tasks([item_id, serial_number, date, sell_cost, time_days, time_hours, fv, ad_info])[0]
+
+    def add_tasks(self, *data: list):
+        """
+        Adds all tasks from lists with one write and one backup.
+        :param list data: lists with add_task arguments
+        :return: list of int new task ids
+        """
+        items = DataReader(True)
+        records = [self.__render_task(items, *task) for task in data]
+        # Ids are reserved and written under one lock, so tasks make one write, journal line in journal mode
+        with self.json_update.locked(), self.json_update.transaction():
+            first_id = self.json_update.reserve_ids(len(records))
+            new_ids = list(range(first_id, first_id + len(records)))
+            self.json_update.update_many_json({
+                ItemStore.render_json_id(task_id): record for task_id, record in zip(new_ids, records)
+            })
+        return new_ids
+
+    def update_task(self,
+                    json_id: int,
+                    item_id: int = None,
+                    serial_number: str = None,
+                    date: str = None,
+                    sell_cost: float = None,
+                    time_days: int = None,
+                    time_hours: int = None,
+                    fv: str = None,
+                    ad_info: str = None):
         """
-        Adds simple material to dict.
-        :param str material: material name
-        :param str size: material size
-        :param int number_of: number of material
-        :param int time_for: time spend on material
+        Updates given task, item name is copied again when item changes.
+        :param int json_id: task id
+        :param int item_id: item id
+        :param str serial_number: serial number
+        :param str date: date like "29.02.24"
+        :param float sell_cost: price
+        :param int time_days: days spent on task
+        :param int time_hours: hours spent on task
+        :param str fv: invoice number
+        :param str ad_info: additional info
         :return: Nothing
         """
-        self.__update_materials_dict(
-            len(self.__materials_dict),
-            self.__render_temp_dict(
-                self.__prepare_data_list(
-                    len(self.__materials_dict),
-                    material,
-                    size,
-                    number_of if number_of else self.__check_default(int),
-                    time_for
-                ),
-                self.__materials_struct)
-        )
+        render_json_id = ItemStore.render_json_id(json_id)
+        # Task is read and written under one lock, so concurrent writer or process can not change it in between
+        with self.json_update.locked():
+            found, loaded = self.json_update.return_pending(render_json_id)
+            if found and loaded is None:
+                raise KeyError(render_json_id)
+            if not found:
+                loaded = DataReader(False).return_data_dict(json_id)
+            task = loaded.to_json()
+            if item_id is not None:
+                task["item_id"] = item_id
+                task["item_name"] = DataReader(True).return_data_dict(item_id).name
+            for key, value in (("s/n", serial_number), ("date", self.__check_date(date) if date else None),
+                               ("sell_cost", sell_cost), ("time_days", time_days), ("time_hours", time_hours),
+                               ("fv", fv), ("ad_info", ad_info)):
+                if value is not None:
+                    task[key] = self.__task_struct[key](value)
+            self.json_update.update_json(render_json_id, task)
 
-    def update_material(self,
-                        json_id: int,
-                        material: str = None,
-                        size: str = None,
-                        time_for: int = None,
-                        number_of: int = None):
+    def delete_task(self, json_id: int):
         """
-        Updates given json id in materials dict
+        Deletes given task from json file.
         :param json_id: json ID
-        :param material: material name
-        :param size: material size
-        :param time_for: time for work with material
-        :param number_of: number of materials
         :return: Nothing
         """
-        material_dict = self.__load_json_section(materials_bool=True)[json_id]
-        self.__update_materials_dict(
-            json_id,
-            self.__render_temp_dict(
-                self.__prepare_data_list(
-                    json_id,
-                    material if material else material_dict["material"],
-                    size if size else material_dict["size"],
-                    time_for if time_for else material_dict["time_for"],
-                    number_of if number_of else material_dict["number_of"]
-                ),
-                self.__materials_struct
-            )
-        )
+        self.json_update.delete_from_json(ItemStore.render_json_id(json_id))
 
-    def delete_material(self, json_id: int):
+    @contextmanager
+    def batch(self):
         """
-        Deletes given id from materials
-        :param json_id: json ID
+        Groups task changes made inside with block, they are written on its end
+        with one write and one backup. Nothing is written when block raises exception.
         :return: Nothing
         """
-        self.__materials_dict = self.__load_json_section(materials_bool=True)
-        self.__materials_dict.pop(json_id)
+        with self.json_update.transaction():
+            yield self
 
     # endregion
-    # region Work Materials
+    # region Private Methods
 
-    def add_work_materials(self, *data: list):
+    def __render_task(self,
+                      items: DataReader,
+                      item_id: int,
+                      serial_number: str,
+                      date: str,
+                      sell_cost: float = None,
+                      time_days: int = None,
+                      time_hours: int = None,
+                      fv: str = None,
+                      ad_info: str = None):
+        """
+        Renders task dict for given item.
+        :param DataReader items: items reader
+        :return: dict with task struct keys
+        """
+        item = items.return_data_dict(item_id)
+        values = [
+            item_id,
+            item.name,
+            serial_number,
+            fv,
+            self.__check_date(date),
+            sell_cost if sell_cost is not None else item.sell_cost,
+            time_days,
+            time_hours,
+            ad_info
+        ]
+        task = {}
+        for (key, value_type), value in zip(self.__task_struct.items(), values):
+            task[key] = value_type(value) if value is not None else self.__check_default(value_type)
+        return task
+
+    @staticmethod
+    def __check_date(date: str):
         """
-        Adds all materials data from list to dict.
-        :param list data: lists with material data
-        :return: Nothing
+        Checks task date.
+        :param str date: date like "29.02.24"
+        :return: str date
         """
-        for item in data:
-            self.add_work_material(
-                item[0],
-                item[1],
-                item[2],
-                item[3]
-            )
+        if Task.parse_date(date) is None:
+            raise ValueError(f"Wrong date: {date!r}, expected format like 29.02.24")
+        return date
 
-    def add_work_material(self, material: str, size: str, number_of: int = None, cost: float = None):
+    @classmethod
+    def __check_default(cls, variable):
         """
-        Adds simple material to dict.
-        :param str material: material name
-        :param str size: material size
-        :param int number_of: number of material
-        :param float cost: time spend on material
-        :return: Nothing
+        Returns an default value for given var type.
+        :param variable: variable type
+        :return: default value
         """
-        self.__update_work_materials_dict(
-            len(self.__work_materials_dict),
-            self.__render_temp_dict(
-                self.__prepare_data_list(
-                    len(self.__work_materials_dict),
-                    material,
-                    size,
-                    number_of if number_of else self.__check_default(int),
-                    cost if cost else self.__check_default(float)
-                ),
-                self.__work_materials_struct)
-        )
+        if variable == str:
+            return cls.__default_str
+        return cls.__default_int
 
-    def update_work_material(self,
-                             json_id,
-                             material: str = None,
-                             size: str = None,
-                             number_of: int = None,
-                             cost: float = None):
+    # endregion
+
+
+class BulkTransfer:
+
+    __item_section_str = "Items"
+    __task_section_str = "Tasks"
+    # CSV row type -> item section it is written into
+    __csv_row_types = {
+        "item": "Items",
+        "material": "materials",
+        "work_material": "work_materials",
+        "step": "production_steps"
+    }
+    __csv_type_column = "type"
+    __id_key = "id"
+    __default_int = 0
+    __default_str = "N/A"
+
+    def __init__(self, item_type: bool):
+        self.item_type = item_type
+        self.section = self.__item_section_str if item_type else self.__task_section_str
+        self.structs = ItemsWriter.return_structs()
+        self.structs[self.__task_section_str] = TasksWriter.return_struct()
+
+    # region Public methods
+
+    def import_file(self, file_name: str):
         """
-        Updates given json id in materials dict
-        :param json_id: json ID
-        :param material: material name
-        :param size: material size
-        :param cost: material cost
-        :param number_of: number of materials
-        :return: Nothing
+        Reads CSV/JSONL file record by record, validates all records and writes them with one write and one backup.
+        Nothing is written when any record is wrong.
+        :param str file_name: .csv or .jsonl file
+        :return: list of int ids given to imported records
         """
-        work_material_dict = self.__load_json_section(work_materials_bool=True)[json_id]
-        self.__update_work_materials_dict(
-            json_id,
-            self.__render_temp_dict(
-                    self.__prepare_data_list(
-                        json_id,
-                        material if material else work_material_dict["material"],
-                        size if size else work_material_dict["size"],
-                        cost if cost else work_material_dict["cost"],
-                        number_of if number_of else work_material_dict["number_of"]
-                    ),
-                    self.__work_materials_struct
-                )
-        )
+        items_store = DataReader(True).store
+        records = []
+        for line, values in self.__read_file(file_name):
+            try:
+                record = self.__validate_item(values) if self.item_type else self.__validate_task(values, items_store)
+            except ValueError as error:
+                raise ValueError(f"{file_name}:{line}: {error}") from None
+            records.append(record)
+        if not records:
+            return []
+        json_update = UpdateJson(self.item_type)
+        # Ids are reserved and written under one lock, so import makes one write
+        with json_update.locked(), json_update.transaction():
+            next_id = json_update.reserve_ids(len(records))
+            new_ids = list(range(next_id, next_id + len(records)))
+            json_update.update_many_json({
+                ItemStore.render_json_id(record_id): record for record_id, record in zip(new_ids, records)
+            })
+        return new_ids
 
-    def delete_work_material(self, json_id: int):
+    def export_file(self, file_name: str):
+        """
+        Writes all items/tasks into CSV/JSONL file record by record, archived tasks included.
+        :param str file_name: .csv or .jsonl file
+        :return: int number of exported records
+        """
+        reader = DataReader(self.item_type)
+        file_format = self.__file_format(file_name)
+        count = 0
+        with open(file_name + ".tmp", "w", encoding="utf-8", newline="") as file:
+            if file_format == "jsonl":
+                for item_id in reader.return_ids():
+                    file.write(json.dumps(self.__export_values(item_id, reader.return_data_dict(item_id)),
+                                          ensure_ascii=False) + "\n")
+                    count += 1
+            else:
+                columns = self.__csv_columns()
+                writer = csv.DictWriter(file, columns)
+                writer.writeheader()
+                for item_id in reader.return_ids():
+                    writer.writerows(self.__csv_rows(item_id, reader.return_data_dict(item_id)))
+                    count += 1
+        os.replace(file_name + ".tmp", file_name)
+        return count
+
+    # endregion
+    # region Private methods
+
+    def __read_file(self, file_name: str):
+        """
+        Reads records from file. Nested CSV rows are joined with item row above them.
+        :param str file_name: .csv or .jsonl file
+        :return: generator of (line number, dict with record values)
+        """
+        with open(file_name, "r", encoding="utf-8-sig", newline="") as file:
+            if self.__file_format(file_name) == "jsonl":
+                for line, text in enumerate(file, 1):
+                    if not text.strip():
+                        continue
+                    try:
+                        values = json.loads(text)
+                    except json.JSONDecodeError as error:
+                        raise ValueError(f"{file_name}:{line}: {error}") from None
+                    if not isinstance(values, dict):
+                        raise ValueError(f"{file_name}:{line}: record has to be JSON object")
+                    yield line, values
+                return
+            rows = csv.DictReader(file)
+            unknown = set(rows.fieldnames or ()) - set(self.__csv_columns())
+            if unknown:
+                raise ValueError(f"{file_name}: unknown columns: {', '.join(sorted(unknown))}")
+            if not self.item_type:
+                for line, row in enumerate(rows, 2):
+                    yield line, row
+                return
+            item_line, item = None, None
+            for line, row in enumerate(rows, 2):
+                row_type = (row.pop(self.__csv_type_column, None) or "item").strip()
+                if row_type not in self.__csv_row_types:
+                    raise ValueError(f"{file_name}:{line}: unknown row type: {row_type}")
+                section = self.__csv_row_types[row_type]
+                values = {key: value for key, value in row.items()
+                          if key in self.structs[section] and value not in (None, "")}
+                if row_type == "item":
+                    if item is not None:
+                        yield item_line, item
+                    item_line, item = line, values
+                elif item is None:
+                    raise ValueError(f"{file_name}:{line}: {row_type} row has to follow item row")
+                else:
+                    item.setdefault(section, []).append(values)
+            if item is not None:
+                yield item_line, item
+
+    def __validate_item(self, values: dict):
+        """
+        Checks item and its nested records against structs, nested records get ids by position.
+        :param dict values: item values
+        :return: dict item ready to write
+        """
+        item = self.__validate(values, self.structs[self.__item_section_str])
+        for section in (key for key, value_type in self.structs[self.__item_section_str].items() if value_type is dict):
+            nested = values.get(section) or []
+            if isinstance(nested, dict):
+                nested = list(nested.values())
+            if not isinstance(nested, list) or not all(isinstance(record, dict) for record in nested):
+                raise ValueError(f"{section} has to be list of objects")
+            item[section] = {}
+            for position, record in enumerate(nested):
+                record = dict(record, **{self.__id_key: position})
+                item[section][str(position)] = self.__validate(record, self.structs[section])
+        return item
+
+    def __validate_task(self, values: dict, items_store: ItemStore):
+        """
+        Checks task against struct, item name is taken from item when not given.
+        :param dict values: task values
+        :param ItemStore items_store: items store
+        :return: dict task ready to write
+        """
+        task = self.__validate(values, self.structs[self.__task_section_str])
+        item = items_store.get(task["item_id"])
+        if item is None:
+            raise ValueError(f"item {task['item_id']} does not exist")
+        if not values.get("item_name"):
+            task["item_name"] = item.name
+        if values.get("date") and Task.parse_date(task["date"]) is None:
+            raise ValueError(f"wrong date {task['date']!r}, expected format like 01.01.24")
+        return task
+
+    def __validate(self, values: dict, struct: dict):
+        """
+        Converts values into struct types, missing values get defaults.
+        :param dict values: record values
+        :param dict struct: key -> type
+        :return: dict with struct keys
+        """
+        unknown = set(values) - set(struct) - {self.__id_key}
+        if unknown:
+            raise ValueError(f"unknown keys: {', '.join(sorted(unknown))}")
+        result = {}
+        for key, value_type in struct.items():
+            if value_type is dict:
+                continue
+            value = values.get(key)
+            if value is None or value == "":
+                result[key] = self.__default_str if value_type is str else self.__default_int
+                continue
+            try:
+                if isinstance(value, bool) or (value_type is int and isinstance(value, float) and
+                                               not value.is_integer()):
+                    raise ValueError
+                result[key] = value_type(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"wrong {key} value {value!r}, expected {value_type.__name__}") from None
+        return result
+
+    def __export_values(self, record_id: int, record: Record):
         """
-        Deletes given id from work materials
-        :param json_id: json ID
-        :return: Nothing
+        Renders record for JSONL file, nested records are written as lists.
+        :param int record_id: item/task id
+        :param Record record: item/task record
+        :return: dict with id and JSON keys
         """
-        self.__work_materials_dict = self.__load_json_section(work_materials_bool=True)
-        self.__work_materials_dict.pop(json_id)
+        values = {self.__id_key: record_id}
+        for key, value in record.to_json().items():
+            values[key] = list(value.values()) if isinstance(value, dict) else value
+        return values
+
+    def __csv_columns(self):
+        """
+        Returns CSV columns, item rows and nested rows share one header.
+        :return: list of str columns
+        """
+        if not self.item_type:
+            return [self.__id_key] + list(self.structs[self.__task_section_str])
+        columns = [self.__csv_type_column, self.__id_key]
+        for section in self.__csv_row_types.values():
+            columns += [key for key, value_type in self.structs[section].items()
+                        if value_type is not dict and key not in columns]
+        return columns
+
+    def __csv_rows(self, record_id: int, record: Record):
+        """
+        Renders record as CSV rows, item row is followed by its materials, work materials and steps.
+        :param int record_id: item/task id
+        :param Record record: item/task record
+        :return: list of dict rows
+        """
+        values = record.to_json()
+        if not self.item_type:
+            return [dict({key: values.get(key) for key in self.structs[self.__task_section_str]},
+                         **{self.__id_key: record_id})]
+        rows = []
+        for row_type, section in self.__csv_row_types.items():
+            nested = [values] if section == self.__item_section_str else (values.get(section) or {}).values()
+            for nested_values in nested:
+                row = {key: nested_values.get(key) for key, value_type in self.structs[section].items()
+                       if value_type is not dict}
+                row[self.__csv_type_column] = row_type
+                row[self.__id_key] = record_id if section == self.__item_section_str else nested_values.get("id")
+                rows.append(row)
+        return rows
+
+    @staticmethod
+    def __file_format(file_name: str):
+        """
+        Returns file format from extension.
+        :param str file_name: file name
+        :return: str csv or jsonl
+        """
+        extension = path.splitext(file_name)[1].lower()
+        if extension == ".csv":
+            return "csv"
+        if extension in (".jsonl", ".ndjson"):
+            return "jsonl"
+        raise ValueError(f"Unknown file format of {file_name}, accepted extensions: .csv, .jsonl")
 
     # endregion
-    # region Steps
 
-    def add_steps(self, *data: list):
+
+class StorageBackend(ABC):
+
+    # Backend keeps Meta section (generation, reserved ids) in document, shared file needs it
+    keeps_meta = False
+
+    # region Public methods
+
+    @abstractmethod
+    def load_document(self):
         """
-        Adds all materials data from list to dict.
-        :param list data: lists with material data
+        Loads library document.
+        :return: dict with Items/Tasks sections
+        """
+
+    @abstractmethod
+    def commit(self, document: dict, changes: list):
+        """
+        Writes changes already applied on loaded document.
+        :param dict document: loaded document
+        :param list changes: (section, json id, record) tuples, record is None for deleted id
         :return: Nothing
         """
-        for item in data:
-            self.add_step(
-                item[0],
-                item[1]
-            )
 
-    def add_step(self, step: str, time: int):
+    def compact(self):
         """
-        Adds simple step to dict.
-        :param str step: step
-        :param int time: time spent on step
+        Folds pending changes into main storage.
         :return: Nothing
         """
-        self.__update_steps_dict(
-            len(self.__steps_dict),
-            self.__render_temp_dict(
-                self.__prepare_data_list(
-                    len(self.__steps_dict),
-                    step,
-                    time
-                ),
-                self.__steps_struct)
-        )
 
-    def update_step(self, json_id, step: str = None, time: int = None):
+    def reserve_ids(self, section: str, first_id: int, count: int):
         """
-        Updates given json id in steps dict
-        :param json_id: json ID
-        :param step: step
-        :param time: time for step
+        Takes ids in storage shared by processes, backends keeping Meta section store counter with records.
+        :param str section: Items or Tasks
+        :param int first_id: lowest id free in loaded document
+        :param int count: number of needed ids
+        :return: int first reserved id
+        """
+        return first_id
+
+    # endregion
+
+
+class JsonBackend(StorageBackend):
+
+    keeps_meta = True
+
+    def __init__(self):
+        self.base = BaseReader()
+        self.file_name = self.base.library_file_name
+        config = EngineConfigReader()
+        self.journal_mode = config.return_journal_mode()
+        self.journal_compact_limit = config.return_journal_compact_limit()
+
+    # region Public methods
+
+    def load_document(self):
+        """
+        Loads library document from json file and its journal. Reading takes no lock file:
+        json file is replaced atomically, broken last journal line is skipped and file is
+        parsed again when its stamp changes, so readers never wait for writers of other processes.
+        :return: dict with Items/Tasks sections
+        """
+        return self.base.load_json(self.file_name)
+
+    def commit(self, document: dict, changes: list):
+        """
+        Rewrites json file or appends changes to journal in journal mode.
+        :param dict document: loaded document
+        :param list changes: (section, json id, record) tuples, record is None for deleted id
         :return: Nothing
         """
-        step_dict = self.__load_json_section(steps_bool=True)[json_id]
-        self.__update_steps_dict(
-            json_id,
-            self.__render_temp_dict(
-                self.__prepare_data_list(
-                    json_id,
-                    step if step else step_dict["step"],
-                    time if time else step_dict["time"]
-                ),
-                self.__steps_struct
-            )
+        if not self.journal_mode:
+            self.base.save_json(self.file_name, document)
+            return
+        journal_length = self.base.append_journal(
+            self.file_name,
+            document,
+            [{"section": section, "id": json_id, "data": record} for section, json_id, record in changes]
         )
+        if journal_length >= self.journal_compact_limit:
+            self.base.save_json(self.file_name, document)
 
-    def delete_step(self, json_id: int):
+    def compact(self):
         """
-        Deletes given id from steps
-        :param json_id: json ID
+        Folds journal into json file.
         :return: Nothing
         """
-        self.__steps_dict = self.__load_json_section(steps_bool=True)
-        self.__steps_dict.pop(json_id)
+        self.base.save_json(self.file_name, self.load_document())
 
     # endregion
-    # endregion
 
-    # region Private Methods
 
-    # region Update dicts
+class SqliteBackend(StorageBackend):
+
+    __items_table = "items"
+    __tasks_table = "tasks"
+    __config_table = "config"
+    __ids_table = "next_ids"
+    # Section -> table holding its records
+    __section_tables = {"Items": __items_table, "Tasks": __tasks_table}
+    # Item section JSON key -> table name
+    __nested_tables = {
+        "work_materials": "work_materials",
+        "materials": "materials",
+        "production_steps": "steps"
+    }
+    # Shared connections: database file name -> connection
+    __connections = {}
+    # Loaded documents: database file name -> (data version, document)
+    __documents = {}
+
+    def __init__(self, file_name: str = None):
+        self.base = BaseReader()
+        self.file_name = file_name if file_name else EngineConfigReader().return_sqlite_file_name()
+        self.connection = self.__connect()
+
+    # region Public methods
+
+    def load_document(self):
+        """
+        Loads library document from database. Document is read again only after other connection commits.
+        :return: dict with Items/Tasks sections
+        """
+        with self.base.document_lock:
+            data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+            cached = self.__documents.get(self.file_name)
+            if cached and cached[0] == data_version:
+                return cached[1]
+            document = {
+                "Items": self.__read_items(),
+                "Tasks": self.__read_records(self.__tasks_table, Task)
+            }
+            self.__documents[self.file_name] = (data_version, document)
+            return document
+
+    def commit(self, document: dict, changes: list):
+        """
+        Writes changed rows in one transaction.
+        :param dict document: loaded document
+        :param list changes: (section, json id, record) tuples, record is None for deleted id
+        :return: Nothing
+        """
+        with self.base.document_lock:
+            try:
+                with self.connection:
+                    self.__write_changes(changes)
+            except Exception:
+                # Loaded document already has changes, it is read again from rolled back database
+                self.__documents.pop(self.file_name, None)
+                raise
+
+    def reserve_ids(self, section: str, first_id: int, count: int):
+        """
+        Takes ids from counter table in immediate transaction, which holds database write lock,
+        so processes sharing database never get the same id. Counter starts after highest row id.
+        :param str section: Items or Tasks
+        :param int first_id: lowest id free in loaded document
+        :param int count: number of needed ids
+        :return: int first reserved id
+        """
+        with self.base.document_lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            with self.connection:
+                stored = self.connection.execute(
+                    f"SELECT next_id FROM {self.__ids_table} WHERE section = ?", (section,)
+                ).fetchone()
+                highest = self.connection.execute(
+                    f"SELECT max(id) FROM {self.__section_tables[section]}"
+                ).fetchone()[0]
+                first_id = max(
+                    first_id,
+                    stored[0] if stored else 0,
+                    highest + 1 if highest is not None else 0
+                )
+                self.connection.execute(
+                    f"INSERT OR REPLACE INTO {self.__ids_table} (section, next_id) VALUES (?, ?)",
+                    (section, first_id + count)
+                )
+            return first_id
+
+    def import_json(self):
+        """
+        Replaces database content with data.json and config.json content in one transaction,
+        database is left as it was when anything fails.
+        :return: Nothing
+        """
+        config = self.base.load_json(self.base.config_file_name)
+        # Records are streamed one by one, whole library is never held in memory
+        changes = (
+            (section, ItemStore.render_json_id(item_id), record)
+            for section, item_id, record in JsonStreamReader(self.base.library_file_name).iterate_records()
+        )
+        with self.base.document_lock:
+            try:
+                self.__import(config, changes)
+            except ValueError as error:
+                # Broken data.json is read like load_json reads it, from last backup
+                print(f"File {self.base.library_file_name} can not be streamed: {error}")
+                document = self.base.load_json(self.base.library_file_name)
+                self.__import(config, (
+                    (section, json_id, ItemStore.record_classes[section].from_json(
+                        record.to_json() if isinstance(record, Record) else record
+                    ))
+                    for section in ItemStore.record_classes
+                    for json_id, record in document.get(section, {}).items()
+                ))
+            finally:
+                self.__documents.pop(self.file_name, None)
+
+    def export_json(self, include_config: bool = False):
+        """
+        Writes database content into data.json, and config.json if asked.
+        :param bool include_config: exports config saved by import_json
+        :return: Nothing
+        """
+        self.base.save_json(self.base.library_file_name, self.load_document(), cache=False)
+        if include_config:
+            config = {
+                name: json.loads(value)
+                for name, value in self.connection.execute(f"SELECT name, value FROM {self.__config_table}")
+            }
+            if config:
+                self.base.save_json(self.base.config_file_name, config, cache=False)
+
+    # endregion
+    # region Private methods
 
-    def __update_materials_dict(self, last_id: int, data: dict):
+    def __import(self, config: dict, changes):
         """
-        Updates materials dict.
-        :param int last_id: last material ID
-        :param dict data: dict with material data
+        Replaces all tables with given config and records in one transaction.
+        :param dict config: config.json content
+        :param changes: iterable of (section, json id, record) tuples
         :return: Nothing
         """
-        self.__materials_dict.update({str(last_id): {}})
-        for key, value in data.items():
-            self.__materials_dict[str(last_id)].update({key: value})
+        with self.connection:
+            for table in (self.__items_table, self.__tasks_table, self.__config_table, self.__ids_table) + \
+                    tuple(self.__nested_tables.values()):
+                self.connection.execute(f"DELETE FROM {table}")
+            self.connection.executemany(
+                f"INSERT INTO {self.__config_table} (name, value) VALUES (?, ?)",
+                [(name, json.dumps(value, ensure_ascii=False)) for name, value in config.items()]
+            )
+            self.__write_changes(changes)
 
-    def __update_work_materials_dict(self, last_id: int, data: dict):
+    def __write_changes(self, changes):
         """
-        Updates materials dict.
-        :param int last_id: last material ID
-        :param dict data: dict with material data
+        Writes changed rows, caller opens transaction.
+        :param changes: iterable of (section, json id, record) tuples, record is None for deleted id
         :return: Nothing
         """
-        self.__work_materials_dict.update({str(last_id): {}})
-        for key, value in data.items():
-            self.__work_materials_dict[str(last_id)].update({key: value})
+        for section, json_id, record in changes:
+            record_id = ItemStore.parse_json_id(json_id)
+            if section == "Items":
+                self.__write_item(record_id, record)
+            else:
+                self.__write_record(self.__tasks_table, Task, record_id, record)
 
-    def __update_steps_dict(self, last_id: int, data: dict):
+    def __connect(self):
+        """
+        Returns shared connection to database, creates tables at first connection.
+        :return: sqlite3 connection
+        """
+        connection = self.__connections.get(self.file_name)
+        if connection:
+            return connection
+        import sqlite3
+        connection = sqlite3.connect(self.file_name, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        with connection:
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.__items_table} "
+                f"(id INTEGER PRIMARY KEY, {self.__columns(Item)}, extra)"
+            )
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.__tasks_table} "
+                f"(id INTEGER PRIMARY KEY, {self.__columns(Task)}, extra)"
+            )
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.__tasks_table}_item_id ON {self.__tasks_table} (item_id)"
+            )
+            for json_key, table in self.__nested_tables.items():
+                # Primary key index also serves lookups by item_id
+                connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} "
+                    f"(item_id INTEGER NOT NULL, {self.__columns(Item.nested[json_key])}, extra, "
+                    f"PRIMARY KEY (item_id, id))"
+                )
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.__config_table} (name TEXT PRIMARY KEY, value TEXT)"
+            )
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.__ids_table} (section TEXT PRIMARY KEY, next_id INTEGER NOT NULL)"
+            )
+        self.__connections[self.file_name] = connection
+        return connection
+
+    @staticmethod
+    def __columns(record_class):
         """
-        Updates materials dict.
-        :param int last_id: last material ID
-        :param dict data: dict with material data
-        :return: Nothing
+        Returns table columns for record fields, nested sections have own tables.
+        :param record_class: record class
+        :return: str comma separated column names
         """
-        self.__steps_dict.update({str(last_id): {}})
-        for key, value in data.items():
-            self.__steps_dict[str(last_id)].update({key: value})
+        return ", ".join(attribute for json_key, attribute in record_class.fields if json_key not in record_class.nested)
 
-    # endregion
+    @staticmethod
+    def __render_row(record_class, record: Record):
+        """
+        Returns column values of record.
+        :param record_class: record class
+        :param Record record: record
+        :return: list of values
+        """
+        values = [getattr(record, attribute) for json_key, attribute in record_class.fields
+                  if json_key not in record_class.nested]
+        values.append(json.dumps(record.extra, ensure_ascii=False) if record.extra else None)
+        return values
 
     @staticmethod
-    def __render_temp_dict(data: list, struct: dict):
+    def __render_record(record_class, row):
+        """
+        Creates record from table row.
+        :param record_class: record class
+        :param row: sqlite3 row
+        :return: record object
+        """
+        record = record_class(**{attribute: row[attribute] for json_key, attribute in record_class.fields
+                                 if json_key not in record_class.nested})
+        if row["extra"]:
+            record.extra = json.loads(row["extra"])
+        return record
+
+    def __read_records(self, table: str, record_class):
         """
-        Renders a temporary dict from given data and for given struct.
-        :param list data: list with material data
-        :param dict struct: dict struct
-        :return: dict with correlated keys and values
+        Reads all records from table.
+        :param str table: table name
+        :param record_class: record class
+        :return: dict json id -> record
         """
-        result = struct
-        iterator = 0
-        for key in struct.keys():
-            result[key] = data[iterator]
-            iterator += 1
+        result = {}
+        for row in self.connection.execute(f"SELECT * FROM {table} ORDER BY id"):
+            result[ItemStore.render_json_id(row["id"])] = self.__render_record(record_class, row)
         return result
 
-    @classmethod
-    def __check_default(cls, variable):
+    def __read_items(self):
+        """
+        Reads all items with their materials, work materials and steps.
+        :return: dict json id -> Item
+        """
+        items = self.__read_records(self.__items_table, Item)
+        for item in items.values():
+            for json_key in self.__nested_tables:
+                setattr(item, Item.attributes[json_key], {})
+        for json_key, table in self.__nested_tables.items():
+            attribute = Item.attributes[json_key]
+            for row in self.connection.execute(f"SELECT * FROM {table} ORDER BY item_id, id"):
+                item = items.get(ItemStore.render_json_id(row["item_id"]))
+                if item:
+                    getattr(item, attribute)[row["id"]] = self.__render_record(Item.nested[json_key], row)
+        return items
+
+    def __write_record(self, table: str, record_class, record_id: int, record):
         """
-        Returns an default value for given var type.
-        :param variable: variable type
-        :return: default value
+        Replaces or deletes one row.
+        :param str table: table name
+        :param record_class: record class
+        :param int record_id: record id
+        :param record: record, None deletes row
+        :return: Nothing
         """
-        if variable == str:
-            return cls.__default_str
-        if variable == int:
-            return cls.__default_int
-        if variable == float:
-            return cls.__default_int
+        if record is None:
+            self.connection.execute(f"DELETE FROM {table} WHERE id = ?", (record_id,))
+            return
+        if not isinstance(record, Record):
+            record = record_class.from_json(record)
+        values = self.__render_row(record_class, record)
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO {table} VALUES ({', '.join('?' * (len(values) + 1))})",
+            [record_id] + values
+        )
 
-    def __load_json_item(self, json_id: str):
+    def __write_item(self, item_id: int, item):
         """
-        Loads given item into class variable
-        :param str json_id: item id
+        Replaces or deletes item row and rows of its sections.
+        :param int item_id: item id
+        :param item: Item record, None deletes item
         :return: Nothing
         """
-        base = BaseReader()
-        file = base.load_json(base.library_file_name)
-        self.__loaded_item = file[self.__item_section_str][json_id]
+        for table in self.__nested_tables.values():
+            self.connection.execute(f"DELETE FROM {table} WHERE item_id = ?", (item_id,))
+        self.__write_record(self.__items_table, Item, item_id, item)
+        if item is None:
+            return
+        if not isinstance(item, Record):
+            item = Item.from_json(item)
+        for json_key, table in self.__nested_tables.items():
+            nested_class = Item.nested[json_key]
+            rows = [[item_id] + self.__render_row(nested_class, nested)
+                    for nested in (getattr(item, Item.attributes[json_key]) or {}).values()]
+            if rows:
+                self.connection.executemany(
+                    f"INSERT INTO {table} VALUES ({', '.join('?' * len(rows[0]))})",
+                    rows
+                )
 
-    def __load_json_section(self,
-                            materials_bool: bool = False,
-                            work_materials_bool: bool = False,
-                            steps_bool: bool = False):
+    # endregion
+
+
+class ChangeNotifier:
+
+    insert_change = "insert"
+    update_change = "update"
+    delete_change = "delete"
+    __listeners = []
+    __lock = threading.Lock()
+
+    # region Public methods
+
+    @classmethod
+    def subscribe(cls, listener):
         """
-        Returns loaded section from json dict.
-        :param materials_bool: section selector
-        :param work_materials_bool: section selector
-        :param steps_bool: section selector
-        :return:
+        Adds listener called after every write. Listener can be called from any thread.
+        :param listener: func taking section name, change kind and list of int ids
+        :return: Nothing
         """
-        section = str
-        if materials_bool:
-            section = self.__material_section_str
-        if work_materials_bool:
-            section = self.__work_materials_section_str
-        if steps_bool:
-            section = self.__steps_section_str
-        return self.__loaded_item[section]
+        with cls.__lock:
+            cls.__listeners.append(listener)
 
-    @staticmethod
-    def __render_json_id(json_id: int):
+    @classmethod
+    def unsubscribe(cls, listener):
         """
-        Generates item id writen like in json file
-        :param int json_id: int value of json id
-        :return: str json id
+        Removes listener.
+        :param listener: func added with subscribe
+        :return: Nothing
         """
-        return "id_" + str(json_id)
-
+        with cls.__lock:
+            if listener in cls.__listeners:
+                cls.__listeners.remove(listener)
 
-    @staticmethod
-    def __prepare_data_list(*args):
+    @classmethod
+    def notify(cls, section: str, change: str, ids: list):
         """
-        Creates list form given args
-        :param args: item to add
-        :return: list of given items
+        Calls all listeners.
+        :param str section: Items/Tasks
+        :param str change: insert/update/delete
+        :param list ids: changed int ids
+        :return: Nothing
         """
-        temp_list = []
-        for item in args:
-            temp_list.append(item)
-        return temp_list
+        with cls.__lock:
+            listeners = list(cls.__listeners)
+        for listener in listeners:
+            listener(section, change, ids)
 
     # endregion
 
@@ -862,68 +3717,476 @@ class UpdateJson:
 
     __item_section_name = "Items"
     __tasks_section_name = "Tasks"
+    # Meta section keeps generation, raised by every write, and next free ids reserved by all processes
+    __meta_section_name = "Meta"
+    __generation_key = "generation"
+    __next_ids_key = "next_ids"
     __section_dict = dict
     __loaded_file = dict
+    __store = None
+    # Shared id counters: (library file name, section) -> next free id
+    __next_ids = {}
 
     def __init__(self, item_type: bool):
+        # Transaction buffer: item/task id -> record, None for deleted id
+        self.__pending = None
+        # Section records as they were when transaction started and generation of that time
+        self.__bases = None
+        self.__base_generation = None
+        self.item_type = item_type
         self.base = BaseReader()
         self.file_name = self.base.library_file_name
+        self.backend = self.base.library_backend()
         if item_type:
             self.section = self.__item_section_name
         if not item_type:
             self.section = self.__tasks_section_name
+        config = EngineConfigReader()
+        self.async_backup = config.return_async_backup()
 
     def update_json(self, json_id: str, data: dict):
         """
-        Rewrites json file.
+        Writes given record through storage backend, in transaction record is written at its end.
         :param str json_id: item/task id
         :param dict data: new data to update
         :return: Nothing
         """
-        self.__load_json()
-        self.__create_backup()
-        with open(self.file_name, "w", encoding="utf-8") as data_file:
-            self.__section_dict.update({json_id: data})
-            json.dump(self.__loaded_file, data_file, ensure_ascii=False, indent=4)
+        self.__write({json_id: data})
 
     def delete_from_json(self, json_id: str):
         """
-        Deletes given json ID and rewrites json file.
+        Deletes given json ID through storage backend, in transaction id is deleted at its end.
         :param json_id: item/task id
         :return: Nothing
         """
-        self.__load_json()
-        self.__create_backup()
-        with open(self.file_name, "w", encoding="utf-8") as data_file:
-            self.__section_dict.pop(json_id)
-            json.dump(self.__loaded_file, data_file, ensure_ascii=False, indent=4)
+        self.__write({json_id: None})
+
+    def update_many_json(self, data: dict):
+        """
+        Writes given records with one write and one backup.
+        :param dict data: item/task id -> new data
+        :return: Nothing
+        """
+        self.__write(data)
+
+    def delete_many_from_json(self, json_ids: list, notify: bool = True):
+        """
+        Deletes given json IDs with one write and one backup.
+        :param list json_ids: item/task ids
+        :param bool notify: tells window about deleted ids
+        :return: Nothing
+        """
+        self.__write(dict.fromkeys(json_ids), notify)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Buffers writes and deletes made inside with block, they are written on its end
+        with one write and one backup. Nothing is written when block raises exception.
+        Records changed meanwhile by other writers are merged key by key, see __merge.
+        Nested transactions are part of outer one.
+        :return: Nothing
+        """
+        if self.__pending is not None:
+            yield self
+            return
+        with self.base.document_lock:
+            self.__pending = {}
+            # Records are replaced on change, never changed in place, so copy of section keeps them as they were
+            self.__bases = dict(self.backend.load_document().get(self.section, {}))
+            self.__base_generation = self.return_generation()
+        try:
+            yield self
+        except BaseException:
+            self.__pending = None
+            self.__bases = None
+            raise
+        pending, self.__pending = self.__pending, None
+        bases, self.__bases = self.__bases, None
+        if pending:
+            self.__apply(pending, True, bases, self.__base_generation)
+
+    @contextmanager
+    def locked(self):
+        """
+        Holds document lock and lock file of library, so no other thread or process
+        writes library inside with block. Used for reads which are written back.
+        :return: Nothing
+        """
+        with self.base.document_lock, FileLock.for_file(self.backend.file_name):
+            yield self
+
+    def return_generation(self):
+        """
+        Returns generation of library document, it is raised by every write of any process.
+        :return: int generation, 0 when backend does not keep it
+        """
+        with self.base.document_lock:
+            meta = self.backend.load_document().get(self.__meta_section_name, {})
+            return meta.get(self.__generation_key, 0)
+
+    def reserve_ids(self, count: int):
+        """
+        Takes ids for new records from shared counter, so writers running at the same time,
+        also in open transactions, never get the same id. Counter starts after highest id,
+        archived and buffered records included, and moves forward when records are added elsewhere.
+        Counter is written into Meta section by commit of reserved records, so reservation itself writes nothing;
+        backends without Meta section take ids in their own storage.
+        Reserve ids and write records inside one locked() and transaction(), then no other process
+        can take them in between; id taken by other process in open transaction makes its commit
+        fail with ValueError instead of overwriting.
+        :param int count: number of needed ids
+        :return: int first reserved id
+        """
+        with self.locked():
+            counter_key = (self.file_name, self.section)
+            meta = self.backend.load_document().get(self.__meta_section_name, {})
+            first_id = max(
+                self.__next_ids.get(counter_key, 0),
+                meta.get(self.__next_ids_key, {}).get(self.section, 0),
+                DataReader(self.item_type).return_next_id(),
+                self.return_pending_last_id() + 1
+            )
+            first_id = self.backend.reserve_ids(self.section, first_id, count)
+            self.__next_ids[counter_key] = first_id + count
+        return first_id
+
+    def return_pending(self, json_id: str):
+        """
+        Returns record buffered by transaction.
+        :param str json_id: item/task id
+        :return: tuple (True, record or None for deleted id), (False, None) when id was not changed
+        """
+        if self.__pending is None or json_id not in self.__pending:
+            return False, None
+        return True, self.__pending[json_id]
+
+    def return_pending_last_id(self):
+        """
+        Returns highest id added in transaction.
+        :return: int highest id, -1 without transaction or added ids
+        """
+        added = [ItemStore.parse_json_id(json_id) for json_id, record in (self.__pending or {}).items()
+                 if record is not None]
+        return max(added, default=-1)
+
+    def compact(self):
+        """
+        Folds journal into json file.
+        :return: Nothing
+        """
+        with self.locked():
+            self.backend.compact()
+
+    def __write(self, data: dict, notify: bool = True):
+        """
+        Writes records or buffers them when transaction is open.
+        :param dict data: item/task id -> new data, None for deleted id
+        :param bool notify: tells window about changed ids
+        :return: Nothing
+        """
+        record_class = ItemStore.record_classes[self.section]
+        records = {
+            json_id: None if record is None else record_class.from_json(
+                record.to_json() if isinstance(record, Record) else record
+            )
+            for json_id, record in data.items()
+        }
+        if self.__pending is None:
+            self.__apply(records, notify)
+            return
+        with self.base.document_lock:
+            section_dict = self.backend.load_document().get(self.section, {})
+            for json_id, record in records.items():
+                if record is None and json_id not in section_dict:
+                    if not self.return_pending(json_id)[1]:
+                        raise KeyError(json_id)
+                    # Record added in this transaction is just dropped
+                    del self.__pending[json_id]
+                    continue
+                self.__pending[json_id] = record
+
+    def __apply(self, records: dict, notify: bool, bases: dict = None, base_generation: int = None):
+        """
+        Applies changes on loaded document and writes them with one commit.
+        Document is loaded again under lock file, so changes of other processes are kept.
+        Missing deleted id raises KeyError before anything is changed.
+        :param dict records: item/task id -> record, None for deleted id
+        :param bool notify: tells window about changed ids
+        :param dict bases: section records as writer saw them, records changed since then are merged
+        :param int base_generation: generation writer saw, nothing is merged when it did not change
+        :return: Nothing
+        """
+        changed = {
+            ChangeNotifier.insert_change: [],
+            ChangeNotifier.update_change: [],
+            ChangeNotifier.delete_change: []
+        }
+        with self.locked():
+            self.__load_json()
+            if bases is not None and (not self.backend.keeps_meta or self.return_generation() != base_generation):
+                records = self.__merge(records, bases)
+            for json_id, record in records.items():
+                if record is None and json_id not in self.__section_dict:
+                    raise KeyError(json_id)
+            for json_id, record in records.items():
+                item_id = ItemStore.parse_json_id(json_id)
+                if record is None:
+                    self.__section_dict.pop(json_id)
+                    self.__store.delete(item_id)
+                    changed[ChangeNotifier.delete_change].append(item_id)
+                    continue
+                change = ChangeNotifier.update_change \
+                    if json_id in self.__section_dict else \
+                    ChangeNotifier.insert_change
+                self.__section_dict[json_id] = record
+                self.__store.upsert(item_id, record)
+                changed[change].append(item_id)
+            self.__commit(*records.items())
+        if notify:
+            for change, ids in changed.items():
+                if ids:
+                    ChangeNotifier.notify(self.section, change, ids)
+
+    def __merge(self, records: dict, bases: dict):
+        """
+        Merges buffered records with records written by other writers since writer saw them.
+        Keys changed only by one of them are taken from it, so no change is lost.
+        :param dict records: item/task id -> record, None for deleted id
+        :param dict bases: item/task id -> record as writer saw it, missing id was not in section
+        :return: dict with merged records, ValueError when both changed the same key or deleted record
+        """
+        record_class = ItemStore.record_classes[self.section]
+        merged = {}
+        for json_id, record in records.items():
+            # Document keeps records read from file as dicts
+            base_json, current_json = (
+                value.to_json() if isinstance(value, Record) else value
+                for value in (bases.get(json_id), self.__section_dict.get(json_id))
+            )
+            if current_json == base_json:
+                merged[json_id] = record
+                continue
+            if record is None or base_json is None or current_json is None:
+                raise ValueError(f"{self.section} {json_id} was changed by other writer")
+            result = dict(current_json)
+            for key, value in record.to_json().items():
+                if value == base_json.get(key):
+                    continue
+                if current_json.get(key) not in (base_json.get(key), value):
+                    raise ValueError(f"{self.section} {json_id} {key} was changed by other writer")
+                result[key] = value
+            merged[json_id] = record_class.from_json(result)
+        return merged
+
+    def __commit(self, *changes):
+        """
+        Writes changes and backups changed records, raises generation of document.
+        :param changes: (item/task id, new data) pairs, data is None for deleted id
+        :return: Nothing
+        """
+        backend_changes = [(self.section, json_id, data) for json_id, data in changes]
+        backup_changes = [(self.section, json_id) for json_id, data in changes]
+        if self.backend.keeps_meta:
+            meta = self.__loaded_file.setdefault(self.__meta_section_name, {})
+            meta[self.__generation_key] = meta.get(self.__generation_key, 0) + 1
+            backend_changes.append((self.__meta_section_name, self.__generation_key, meta[self.__generation_key]))
+            backup_changes.append(("", self.__meta_section_name))
+            # Ids reserved in transaction are written here
+            next_id = max((ItemStore.parse_json_id(json_id) + 1 for json_id, data in changes if data is not None),
+                          default=0)
+            next_ids = meta.get(self.__next_ids_key, {})
+            if next_ids.get(self.section, 0) < next_id:
+                meta[self.__next_ids_key] = next_ids = dict(next_ids, **{self.section: next_id})
+                backend_changes.append((self.__meta_section_name, self.__next_ids_key, next_ids))
+        self.backend.commit(self.__loaded_file, backend_changes)
+        self.__create_backup(backup_changes)
 
     def __load_json(self):
         """
-        Loads json file to class variable
+        Loads library document to class variable
         :return: Nothing
         """
-        self.__loaded_file = self.base.load_json(self.file_name)
+        self.__loaded_file = self.backend.load_document()
         self.__section_dict = self.__loaded_file[self.section]
+        self.__store = ItemStore.for_section(self.__loaded_file, self.section)
 
-    @staticmethod
-    def __create_backup():
+    def __create_backup(self, changes: list):
         """
-        Creates object and runs backup func.
+        Creates object and runs backup func, passes backup to background worker in async mode.
+        :param list changes: (section, id) pairs changed by write
         :return: Nothing
         """
+        if self.async_backup:
+            BackupWorker.instance().submit(True, changes)
+            return
         backup = BackupJson(True)
-        backup.create_backup()
+        backup.create_backup(changes)
+
+
+class BackupWorker:
+
+    __instance = None
+    __queue_size = 64
+    __flush_signal = "flush"
+    __stop_signal = "stop"
+    __wake_signal = "wake"
+
+    def __init__(self, window: float):
+        self.window = window
+        self.__tasks = queue.Queue(self.__queue_size)
+        # Changes submitted while queue was full: data type -> task, joined into next batch
+        self.__overflow = {}
+        self.__overflow_lock = threading.Lock()
+        self.__thread = threading.Thread(target=self.__run, name="BackupWorker", daemon=True)
+        self.__thread.start()
+
+    # region Public methods
+
+    @classmethod
+    def instance(cls):
+        """
+        Returns shared worker, starts it at first call.
+        :return: BackupWorker object
+        """
+        if cls.__instance is None:
+            cls.__instance = cls(EngineConfigReader().return_backup_window())
+            atexit.register(cls.__instance.stop)
+        return cls.__instance
+
+    def submit(self, data_type: bool, changes: list = None):
+        """
+        Queues backup, never waits for worker. Writers call it holding document and file locks,
+        so when queue is full changes are joined into overflow task taken with next batch.
+        :param bool data_type: True for library file, False for config file
+        :param list changes: (section, id) pairs changed since last backup, whole file is compared if not given
+        :return: Nothing
+        """
+        if not self.__thread.is_alive():
+            BackupJson(data_type).create_backup(changes)
+            return
+        try:
+            self.__tasks.put_nowait((data_type, changes))
+            return
+        except queue.Full:
+            pass
+        with self.__overflow_lock:
+            self.__overflow[data_type] = self.__join_tasks([self.__overflow.get(data_type), (data_type, changes)])
+        # Worker could drain queue before overflow was set, signal wakes it; full queue wakes it anyway
+        try:
+            self.__tasks.put_nowait(self.__wake_signal)
+        except queue.Full:
+            pass
+
+    def flush(self):
+        """
+        Creates all queued backups without waiting for time window.
+        :return: Nothing
+        """
+        if self.__thread.is_alive():
+            self.__tasks.put(self.__flush_signal)
+            self.__tasks.join()
+
+    def stop(self):
+        """
+        Flushes queued backups and stops worker.
+        :return: Nothing
+        """
+        if self.__thread.is_alive():
+            self.flush()
+            self.__tasks.put(self.__stop_signal)
+            self.__thread.join()
+
+    # endregion
+    # region Private methods
+
+    def __run(self):
+        """
+        Worker loop. Collects backups queued in time window and creates one backup version for them.
+        :return: Nothing
+        """
+        running = True
+        while running:
+            batch = [self.__tasks.get()]
+            deadline = time.monotonic() + self.window
+            while batch[-1] not in (self.__flush_signal, self.__stop_signal):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.__tasks.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            running = self.__stop_signal not in batch
+            self.__create_backups(batch)
+            for _ in batch:
+                self.__tasks.task_done()
+
+    def __create_backups(self, batch: list):
+        """
+        Joins queued changes for each file and creates backups.
+        :param list batch: queued tasks and signals
+        :return: Nothing
+        """
+        with self.__overflow_lock:
+            overflow, self.__overflow = list(self.__overflow.values()), {}
+        joined = {}
+        for task in batch + overflow:
+            if task in (self.__flush_signal, self.__stop_signal, self.__wake_signal):
+                continue
+            data_type, changes = task
+            if changes is None or (data_type in joined and joined[data_type] is None):
+                joined[data_type] = None
+            else:
+                joined.setdefault(data_type, {}).update(dict.fromkeys(changes))
+        for data_type, changes in joined.items():
+            try:
+                with BaseReader.document_lock:
+                    BackupJson(data_type).create_backup(list(changes) if changes is not None else None)
+            except Exception as error:
+                print(f"Backup failed: {error}")
+
+    @staticmethod
+    def __join_tasks(tasks: list):
+        """
+        Joins queued tasks of one file into one task.
+        :param list tasks: (data type, changes) tasks, None items are skipped
+        :return: (data type, changes) task, changes are None when whole file is compared
+        """
+        data_type, joined = None, {}
+        for task in tasks:
+            if task is None:
+                continue
+            data_type, changes = task
+            if changes is None or joined is None:
+                joined = None
+            else:
+                joined.update(dict.fromkeys(changes))
+        return data_type, list(joined) if joined is not None else None
+
+    # endregion
 
 
 class BackupJson:
 
-    from os import listdir, remove, mkdir
+    from os import listdir, remove, mkdir, path, stat
+    from collections import deque
     __version_limit = 10
     __directory_name = str
     __path = str
+    __objects_path = str
     __file_name = str
     __selector = "__"
+    __objects_directory_name = "objects"
+    __index_suffix = ".index"
+    __backup_format = "delta"
+    # Sections split into separate records, other top level keys are stored as whole records
+    __record_sections = ("Items", "Tasks")
+    __whole_section = ""
+    # Records of last backup version: file name -> (version, {section: {id: object hash}})
+    __heads = {}
+    # Sorted backup versions: file name -> (index file mtime, deque of versions)
+    __indexes = {}
     __file = dict
     __data_type_bool = bool
 
@@ -934,51 +4197,284 @@ class BackupJson:
             self.base.config_file_name
         self.__directory_name = self.base.backup_directory_name
         self.__path = self.__directory_name + "/"
+        self.__objects_path = self.__path + self.__objects_directory_name + "/"
         self.__data_type_bool = data_type
 
-    def create_backup(self):
+    def create_backup(self, changes: list = None):
         """
         Startup func. Creates and deletes backup files.
+        Backup version keeps only records changed since previous version,
+        records content is stored once in objects directory under its hash.
+        Versions are numbered under lock file of backups folder, so processes never write the same version.
+        Lock of backed up file is taken first, in the same order as writers take them.
+        :param list changes: (section, id) pairs changed since last backup, whole file is compared if not given
         :return: Nothing
         """
-        self.__load_file()
         self.__check_directory()
-        with open(self.__create_file_name(), "w", encoding="utf-8") as file:
-            json.dump(self.__file, file, ensure_ascii=False, indent=4)
-        if len(self.__check_versions()) >= self.__version_limit:
-            self.__delete_last_file(
-                self.__create_file_name(
-                    self.__return_oldest_version()
-                )
-            )
+        with FileLock.for_file(self.__file_name), FileLock.for_file(self.__add_path(self.__file_name)):
+            self.__create_version(changes)
 
     def return_last_version(self):
         """
         Returns last version found in backups folder
         :return: int last version
         """
-        self.__load_file()
-        all_versions = self.__check_versions()
+        all_versions = self.__load_index()
         if len(all_versions) > 0:
             return all_versions[len(all_versions) - 1]
         else:
             return 0
 
+    def restore_version(self, version: int = None):
+        """
+        Renders file content saved in given backup version.
+        :param int version: backup version, last version if not given
+        :return: dict with file content
+        """
+        if not version:
+            version = self.return_last_version()
+        version_data = self.__read_version(version)
+        if not self.__is_delta(version_data):
+            return version_data
+        result = {}
+        for section, section_records in self.__collect_records(version).items():
+            for json_id, record_hash in section_records.items():
+                if section == self.__whole_section:
+                    result[json_id] = self.__read_object(record_hash)
+                else:
+                    result.setdefault(section, {})[json_id] = self.__read_object(record_hash)
+        return result
+
     def __load_file(self):
         """
         Loads file into class variable
         :return: Nothing
         """
-        self.__file = self.base.load_json(self.base.library_file_name) \
+        self.__file = self.base.load_library() \
             if self.__data_type_bool else \
             self.base.load_json(self.base.config_file_name)
 
-    def __return_oldest_version(self):
+    # region Records
+
+    def __load_head(self):
+        """
+        Returns records of last backup version, rebuilds them from backup files if needed.
+        :return: tuple with last version and its records, records are None if there is no delta version
+        """
+        last_version = self.return_last_version()
+        cached = self.__heads.get(self.__file_name)
+        if cached and cached[0] == last_version:
+            return cached
+        head = None
+        if last_version and self.__is_delta(self.__read_version(last_version)):
+            head = self.__collect_records(last_version)
+        self.__heads[self.__file_name] = (last_version, head)
+        return last_version, head
+
+    def __compare_records(self, head: dict, changes: list = None):
+        """
+        Stores changed records and returns their hashes.
+        :param dict head: records of last backup version
+        :param list changes: (section, id) pairs to compare, whole file if not given
+        :return: dict {section: {id: hash}}, hash is None for deleted record
+        """
+        result = {}
+        if changes is None:
+            changes = self.__list_records()
+            for section, section_records in head.items():
+                for json_id in section_records:
+                    changes.append((section, json_id))
+        for section, json_id in changes:
+            record = self.__file.get(json_id) \
+                if section == self.__whole_section else \
+                self.__file.get(section, {}).get(json_id)
+            record_hash = self.__write_object(record) if record is not None else None
+            if head.get(section, {}).get(json_id) != record_hash:
+                result.setdefault(section, {})[json_id] = record_hash
+        return result
+
+    def __list_records(self):
+        """
+        Lists all records of loaded file.
+        :return: list of (section, id) pairs
+        """
+        result = []
+        for key, value in self.__file.items():
+            if key in self.__record_sections and isinstance(value, dict):
+                for json_id in value:
+                    result.append((key, json_id))
+            else:
+                result.append((self.__whole_section, key))
+        return result
+
+    def __collect_records(self, version: int):
+        """
+        Collects records of given version by applying versions from base version.
+        :param int version: backup version
+        :return: dict {section: {id: hash}}
+        """
+        chain = []
+        while version is not None:
+            version_data = self.__read_version(version)
+            chain.append(version_data["records"])
+            version = version_data["parent"]
+        result = {}
+        for records in reversed(chain):
+            self.__apply_records(result, records)
+        return result
+
+    @staticmethod
+    def __apply_records(head: dict, records: dict):
+        """
+        Applies version records on given records.
+        :param dict head: records to update
+        :param dict records: version records, None hash deletes record
+        :return: updated head
+        """
+        for section, section_records in records.items():
+            head_section = head.setdefault(section, {})
+            for json_id, record_hash in section_records.items():
+                if record_hash is None:
+                    head_section.pop(json_id, None)
+                else:
+                    head_section[json_id] = record_hash
+        return head
+
+    def __write_object(self, record):
+        """
+        Writes record into objects directory if it is not stored yet.
+        :param record: record to store
+        :return: str record hash
+        """
+        dumped = json.dumps(record, ensure_ascii=False, sort_keys=True, default=self.base.encode_record)
+        record_hash = sha1(dumped.encode("utf-8")).hexdigest()
+        object_name = self.__objects_path + record_hash + ".json"
+        if not self.path.exists(object_name):
+            self.base.atomic_write(object_name, dumped.encode("utf-8"))
+        return record_hash
+
+    def __read_object(self, record_hash: str):
+        """
+        Reads record from objects directory.
+        :param str record_hash: record hash
+        :return: stored record
+        """
+        with open(self.__objects_path + record_hash + ".json", "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    # endregion
+    # region Versions
+
+    def __create_version(self, changes: list = None):
+        """
+        Writes new backup version, called under lock file of backups folder.
+        Index and last version records are read again, other process could add version meanwhile.
+        :param list changes: (section, id) pairs changed since last backup, whole file is compared if not given
+        :return: Nothing
+        """
+        self.__load_file()
+        # Cached index is checked by mtime only, it could miss version added by other process in the same tick
+        self.__indexes.pop(self.__file_name, None)
+        versions = self.__load_index()
+        last_version, head = self.__load_head()
+        if head is None:
+            parent = None
+            records = self.__compare_records({}, None)
+        else:
+            parent = last_version
+            records = self.__compare_records(head, changes)
+            if not records:
+                return
+        new_version = last_version + 1
+        self.__write_version(new_version, parent, records)
+        versions.append(new_version)
+        self.__heads[self.__file_name] = (
+            new_version,
+            self.__apply_records(head if head is not None else {}, records)
+        )
+        if len(versions) >= self.__version_limit:
+            self.__delete_oldest_version(list(versions))
+            versions.popleft()
+        self.__save_index(versions)
+
+    def __write_version(self, version: int, parent, records: dict):
+        """
+        Writes backup version file.
+        :param int version: backup version
+        :param parent: parent version, None for base version
+        :param dict records: changed records
+        :return: Nothing
+        """
+        self.base.atomic_write(
+            self.__create_file_name(version),
+            json.dumps(
+                {"backup_format": self.__backup_format, "parent": parent, "records": records},
+                ensure_ascii=False
+            ).encode("utf-8")
+        )
+
+    def __read_version(self, version: int):
+        """
+        Reads backup version file.
+        :param int version: backup version
+        :return: dict with version data
+        """
+        with open(self.__create_file_name(version), "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def __is_delta(self, version_data: dict):
         """
-        Returns oldest id found in backup folder
-        :return: int oldest version
+        Checks if version file is delta version or full copy of file.
+        :param dict version_data: version data
+        :return: True for delta version
         """
-        return self.__check_versions()[0]
+        return version_data.get("backup_format") == self.__backup_format
+
+    def __delete_oldest_version(self, versions: list):
+        """
+        Deletes oldest version, next version becomes base version.
+        :param list versions: sorted list of all versions
+        :return: Nothing
+        """
+        oldest = versions[0]
+        oldest_data = self.__read_version(oldest)
+        if not self.__is_delta(oldest_data):
+            self.__delete_last_file(self.__create_file_name(oldest))
+            return
+        next_data = self.__read_version(versions[1]) if len(versions) > 1 else {}
+        if self.__is_delta(next_data) and next_data["parent"] == oldest:
+            next_data["records"] = self.__apply_records(oldest_data["records"], next_data["records"])
+            self.__write_version(versions[1], None, next_data["records"])
+        self.__delete_last_file(self.__create_file_name(oldest))
+        self.__delete_unused_objects(self.__collect_hashes(oldest_data["records"]), versions[1:])
+
+    def __delete_unused_objects(self, hashes: set, versions: list):
+        """
+        Deletes objects which are not used by any of given versions.
+        :param set hashes: hashes to check
+        :param list versions: versions left in backups folder
+        :return: Nothing
+        """
+        for version in versions:
+            version_data = self.__read_version(version)
+            if self.__is_delta(version_data):
+                hashes -= self.__collect_hashes(version_data["records"])
+        for record_hash in hashes:
+            self.__delete_last_file(self.__objects_path + record_hash + ".json")
+
+    @staticmethod
+    def __collect_hashes(records: dict):
+        """
+        Collects hashes used by version records.
+        :param dict records: version records
+        :return: set of hashes
+        """
+        result = set()
+        for section_records in records.values():
+            result.update(record_hash for record_hash in section_records.values() if record_hash)
+        return result
+
+    # endregion
 
     def __delete_last_file(self, file_name: str):
         """
@@ -988,13 +4484,57 @@ class BackupJson:
         """
         self.remove(file_name)
 
-    def __check_versions(self):
+    # region Versions index
+
+    def __load_index(self):
+        """
+        Returns sorted versions from index file, index is rebuilt from backups folder if it is missing or broken.
+        :return: deque of versions
+        """
+        index_name = self.__add_path(self.__file_name + self.__index_suffix)
+        try:
+            index_stamp = self.stat(index_name).st_mtime_ns
+        except FileNotFoundError:
+            index_stamp = None
+        cached = self.__indexes.get(self.__file_name)
+        if cached and index_stamp is not None and cached[0] == index_stamp:
+            return cached[1]
+        versions = None
+        if index_stamp is not None:
+            try:
+                with open(index_name, "r", encoding="utf-8") as file:
+                    versions = self.deque(sorted(json.load(file)["versions"]))
+            except (json.JSONDecodeError, KeyError, TypeError):
+                versions = None
+        if versions is None:
+            versions = self.deque(self.__scan_versions())
+            if self.path.exists(self.__path):
+                self.__save_index(versions)
+                return versions
+        self.__indexes[self.__file_name] = (index_stamp, versions)
+        return versions
+
+    def __save_index(self, versions):
+        """
+        Writes versions into index file.
+        :param versions: sorted versions
+        :return: Nothing
+        """
+        index_name = self.__add_path(self.__file_name + self.__index_suffix)
+        self.base.atomic_write(index_name, json.dumps({"versions": list(versions)}).encode("utf-8"))
+        self.__indexes[self.__file_name] = (self.stat(index_name).st_mtime_ns, versions)
+
+    def __scan_versions(self):
         """
         Collects all files from backups
         :return: list with all versions of given file name
         """
         version_list = []
-        for file in self.listdir(self.__path):
+        try:
+            files = self.listdir(self.__path)
+        except FileNotFoundError:
+            return version_list
+        for file in files:
             try:
                 temp_list = file.split(self.__selector)
                 if temp_list[1] == self.__file_name:
@@ -1004,6 +4544,8 @@ class BackupJson:
         version_list.sort()
         return version_list
 
+    # endregion
+
     def __create_file_name(self, version: int = None):
         """
         Generates new file name with newest version
@@ -1027,13 +4569,21 @@ class BackupJson:
 
     def __check_directory(self):
         """
-        Creates new directory if it doesn't exist
+        Creates new directory if it doesn't exist, other process could create it at the same time
         :return: Nothing
         """
         try:
             self.listdir(self.__path)
         except FileNotFoundError:
-            self.mkdir(self.__directory_name)
+            try:
+                self.mkdir(self.__directory_name)
+            except FileExistsError:
+                pass
+        if not self.path.exists(self.__objects_path):
+            try:
+                self.mkdir(self.__objects_path)
+            except FileExistsError:
+                pass
 
 
 
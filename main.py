@@ -1,12 +1,13 @@
-import main_window, data_engine
+import time
+startup_time = time.perf_counter()
+
+import argparse
+import sys
 
 #data = data_engine.DataReader(True)
 #print("Main: ", data.return_all_data())
 
-#test2 = main_window.MainWindow()
-#test2.start_window()
-
-test_write = data_engine.ItemsWriter()
+#test_write = data_engine.ItemsWriter()
 """
 test_write.add_material("Drewno", "15 cm", 3, 5)
 test_write.add_materials(["dr2", "55 cm", 4, 9], ["ite", "90 m", 10, 55])
@@ -22,5 +23,92 @@ test_write.add_new_item(
 )
 """
 #test_write.update_item(json_id=1, name="correct")
-backup_test = data_engine.BackupJson(True)
-print(backup_test.create_backup())
+#backup_test = data_engine.BackupJson(True)
+#print(backup_test.create_backup())
+
+parser = argparse.ArgumentParser(description="DevOrgLittle")
+parser.add_argument("--migrate-sqlite", action="store_true",
+                    help="copy data.json and config.json into SQLite database")
+parser.add_argument("--export-json", action="store_true",
+                    help="write SQLite database content back into data.json")
+parser.add_argument("--export-config", action="store_true",
+                    help="with --export-json, write config saved in database back into config.json")
+parser.add_argument("--profile-startup", action="store_true",
+                    help="report startup times, close window after first paint, fail if budget is exceeded or loading failed")
+parser.add_argument("--archive-tasks", nargs="?", const="", metavar="DATE",
+                    help="move tasks older than DATE (like 01.01.24, DataEngine.archive_before if not given) into archive")
+# Choices are checked by --report branch, engine is not imported before command needs it
+parser.add_argument("--report", metavar="{day,week,month,item}",
+                    help="print revenue, cost, profit and hours of tasks per day, week, month or item")
+parser.add_argument("--from", dest="report_from", metavar="DATE",
+                    help="with --report, skip periods before DATE (like 01.01.24)")
+parser.add_argument("--to", dest="report_to", metavar="DATE",
+                    help="with --report, skip periods after DATE (like 31.12.24)")
+parser.add_argument("--import-items", metavar="FILE",
+                    help="add items with materials and steps from .csv/.jsonl file, written at once with one backup")
+parser.add_argument("--import-tasks", metavar="FILE",
+                    help="add tasks from .csv/.jsonl file, written at once with one backup")
+parser.add_argument("--export-items", metavar="FILE",
+                    help="write all items with materials and steps into .csv/.jsonl file")
+parser.add_argument("--export-tasks", metavar="FILE",
+                    help="write all tasks, archived included, into .csv/.jsonl file")
+args = parser.parse_args()
+
+if args.migrate_sqlite:
+    import data_engine
+    data_engine.SqliteBackend().import_json()
+    print("Data migrated, set DataEngine.backend to sqlite in config.json")
+elif args.export_json:
+    import data_engine
+    data_engine.SqliteBackend().export_json(args.export_config)
+elif args.archive_tasks is not None:
+    import data_engine
+    try:
+        print(f"Archived tasks: {data_engine.TaskArchive().archive_tasks(args.archive_tasks)}")
+    except ValueError as error:
+        parser.error(str(error))
+elif args.import_items or args.import_tasks:
+    import data_engine
+    try:
+        imported_ids = data_engine.BulkTransfer(bool(args.import_items)).import_file(
+            args.import_items or args.import_tasks)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    print(f"Imported: {len(imported_ids)}")
+elif args.export_items or args.export_tasks:
+    import data_engine
+    try:
+        exported = data_engine.BulkTransfer(bool(args.export_items)).export_file(
+            args.export_items or args.export_tasks)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    print(f"Exported: {exported}")
+elif args.report:
+    import data_engine
+    if args.report not in data_engine.TaskAnalytics.granularities:
+        parser.error(f"argument --report: invalid choice: {args.report!r} "
+                     f"(choose from {', '.join(data_engine.TaskAnalytics.granularities)})")
+    report_dates = []
+    for value in (args.report_from, args.report_to):
+        report_date = data_engine.Task.parse_date(value) if value else None
+        if value and report_date is None:
+            parser.error(f"Wrong date: {value!r}, expected format like 01.01.24")
+        report_dates.append(report_date)
+    analytics = data_engine.DataReader(False).return_analytics()
+    print(f"{args.report:<12}" + "".join(f"{measure:>14}" for measure in analytics.measures))
+    for period, values in analytics.return_report(args.report, *report_dates):
+        print(f"{str(period):<12}" + "".join(f"{values[measure]:>14.2f}" for measure in analytics.measures[:-1]) +
+              f"{values['tasks']:>14}")
+else:
+    profiler = None
+    if args.profile_startup:
+        from startup_profiler import StartupProfiler
+        profiler = StartupProfiler(startup_time)
+    # GUI modules and engine are imported only when window is started
+    import main_window
+    if profiler:
+        profiler.mark("imports")
+    window = main_window.MainWindow(profiler)
+    window.start_window()
+    if profiler and (profiler.return_exceeded() or profiler.failures):
+        sys.exit(1)
@@ -1,5 +1,9 @@
+import queue
+import threading
 import tkinter
 import tkinter.ttk
+from bisect import bisect_left
+from collections import OrderedDict
 from tkinter import *
 import data_engine
 
@@ -11,9 +15,11 @@ class MainWindowMainloopDetailSettings:
 
     def __init__(self, item_type, item_id):
         reader = data_engine.TreeviewConfigReader()
-        self.reader = reader.read_items_data()
+        reader.read_items_data()
         self.item_id = item_id
         self.item_type = item_type
+        self.record = data_engine.DataReader(item_type).return_data_dict(item_id)
+        self.__prepared = {}
         self.work_material_data = reader.return_work_material_treeview()
         self.material_data = reader.return_material_treeview()
         self.steps_data = reader.return_steps_treeview()
@@ -34,43 +40,66 @@ class MainWindowMainloopDetailSettings:
         :param data_type: name of section from JSON
         :return: arr with treeview settings
         """
+        if data_type in self.__prepared:
+            return self.__prepared[data_type]
+        records = self.record.get(data_type) or {}
         temp_arr = []
-        temp_arr.clear()
         temp_arr.append(data[0])
         temp_arr.append(data[1])
-        temp_arr.append(self.__read_data()[data_type])
-        temp_arr.append(self.__fill_up_treeview_values(self.__read_data()[data_type], data[2]))
+        temp_arr.append(records)
+        temp_arr.append(self.__fill_up_treeview_values(records, data[2]))
+        self.__prepared[data_type] = temp_arr
         return temp_arr
 
     @staticmethod
     def __fill_up_treeview_values(read_data, treeview_data):
         """
         Generates 2-D array with values form JSON
-        :param dict read_data: data read from JSON
+        :param dict read_data: id -> Material/WorkMaterial/Step records
         :param treeview_data: Given treeview array.
         :return: 2-D array with values from JSON
         """
         result = []
-        for json_id, data in read_data.items():
+        for json_id, record in read_data.items():
             temp_arr = []
             for key in treeview_data:
-                temp_arr.append(data[key])
+                temp_arr.append(record.get(key))
             result.append(temp_arr)
         return result
 
-    def __read_data(self):
+
+class MainWindowDetailsCache:
+
+    def __init__(self, size: int):
+        self.size = size
+        self.__entries = OrderedDict()
+
+    def return_settings(self, item_type: bool, item_id: int):
         """
-        Fill up class task dict.
-        :return: Nothing
+        Returns detail settings for given task/item. Settings are built again only if record has changed.
+        :param bool item_type: True for items, False for tasks
+        :param int item_id: task/item id
+        :return: MainWindowMainloopDetailSettings object
         """
-        data = data_engine.DataReader(self.item_type)
-        return data.return_data_dict(self.item_id)
+        key = (item_type, item_id)
+        settings = self.__entries.get(key)
+        if settings and settings.record is data_engine.DataReader(item_type).return_data_dict(item_id):
+            self.__entries.move_to_end(key)
+            return settings
+        settings = MainWindowMainloopDetailSettings(item_type, item_id)
+        self.__entries[key] = settings
+        self.__entries.move_to_end(key)
+        if len(self.__entries) > self.size:
+            self.__entries.popitem(last=False)
+        return settings
 
 
 class MainWindowMainloopTISettings:
 
     # Struct columns, column_settings, json_data, treeview_values_to_read
     __settings = []
+    __reader = None
+    __rollup = None
 
     def __init__(self, item_type: bool):
         reader = data_engine.TreeviewConfigReader()
@@ -105,15 +134,15 @@ class MainWindowMainloopTISettings:
     def __fill_up_treeview_values(self, read_data):
         """
         Generates 2-D array with values form JSON
-        :param dict read_data: data read from JSON
+        :param dict read_data: id -> Item/Task records
         :return: 2-D array with values from JSON
         """
         result = []
-        for json_id, data in read_data.items():
+        for json_id, record in read_data.items():
             temp_arr = []
             temp_arr.append(json_id)
             for key in self.treeview_values_to_read:
-                temp_arr.append(data[key])
+                temp_arr.append(record.get(key))
             result.append(temp_arr)
         return result
 
@@ -125,21 +154,306 @@ class MainWindowMainloopTISettings:
         data = data_engine.DataReader(self.item_type)
         return data.return_all_data()
 
+    def return_ids(self, search_text: str = ""):
+        """
+        Returns ids of tasks/items, rows values are read later with return_row_values.
+        :param str search_text: items are filtered by it, empty for all items
+        :return: sorted list of int ids
+        """
+        self.__reader = data_engine.DataReader(self.item_type)
+        if self.item_type:
+            self.__rollup = self.__reader.return_rollup()
+        if self.item_type and search_text.strip():
+            return self.__reader.search_items(search_text)
+        return self.__reader.return_ids()
+
+    def return_row_values(self, json_id: int):
+        """
+        Generates treeview row for given task/item.
+        :param int json_id: task/item id
+        :return: arr with row values
+        """
+        return self.render_row_values(json_id, self.__reader.return_data_dict(json_id))
+
+    def render_row_values(self, json_id: int, record):
+        """
+        Generates treeview row for given record, used also for records read before library is loaded.
+        :param int json_id: task/item id
+        :param record: Item/Task record
+        :return: arr with row values
+        """
+        temp_arr = [json_id]
+        for key in self.treeview_values_to_read:
+            if key in data_engine.ItemRollup.column_names:
+                # Computed columns are empty until library is loaded
+                value = self.__rollup.get(json_id, key) if self.__rollup else None
+                temp_arr.append("" if value is None else round(value, 2))
+            else:
+                temp_arr.append(record.get(key))
+        return temp_arr
+
+
+class TreeviewLazyLoader:
+
+    def __init__(self, tree, chunk_size: int, overscan: int):
+        self.tree = tree
+        self.chunk_size = chunk_size
+        self.overscan = overscan
+        # Rows kept in treeview, rows scrolled further away are deleted and inserted again when scrolled back
+        self.window_size = 2 * (chunk_size + overscan)
+        self.__ids = []
+        self.__render_values = None
+        # Ids of treeview rows are self.__ids[self.__start:self.__end]
+        self.__start = 0
+        self.__end = 0
+        self.__loading = False
+        tree.configure(yscrollcommand=self.__on_scroll)
+
+    def load(self, ids: list, render_values):
+        """
+        Replaces treeview rows. Only first chunk is inserted, next chunks are inserted while scrolling.
+        :param list ids: ids of all rows
+        :param render_values: func returning row values for given id
+        :return: Nothing
+        """
+        self.tree.delete(*self.tree.get_children())
+        self.__ids = ids
+        self.__render_values = render_values
+        self.__start = self.__end = 0
+        self.load_more()
+
+    def load_more(self):
+        """
+        Inserts next chunk of rows below, rows above view beyond window size are deleted.
+        :return: Nothing
+        """
+        self.__loading = False
+        top = self.__return_view_top()
+        end = min(self.__end + self.chunk_size, len(self.__ids))
+        for json_id in self.__ids[self.__end:end]:
+            self.__insert('end', json_id)
+        self.__end = end
+        excess = self.__end - self.__start - self.window_size
+        if excess > 0:
+            self.tree.delete(*[str(json_id) for json_id in self.__ids[self.__start:self.__start + excess]])
+            self.__start += excess
+            self.__move_view(top - excess)
+
+    def load_previous(self):
+        """
+        Inserts previous chunk of rows above, rows below view beyond window size are deleted.
+        :return: Nothing
+        """
+        self.__loading = False
+        top = self.__return_view_top()
+        start = max(self.__start - self.chunk_size, 0)
+        for position, json_id in enumerate(self.__ids[start:self.__start]):
+            self.__insert(position, json_id)
+        top += self.__start - start
+        self.__start = start
+        excess = self.__end - self.__start - self.window_size
+        if excess > 0:
+            self.tree.delete(*[str(json_id) for json_id in self.__ids[self.__end - excess:self.__end]])
+            self.__end -= excess
+        self.__move_view(top)
+
+    def insert_row(self, json_id: int):
+        """
+        Adds new row, row is inserted into treeview only if its position is inside loaded rows.
+        :param int json_id: row id
+        :return: Nothing
+        """
+        position = bisect_left(self.__ids, json_id)
+        if position < len(self.__ids) and self.__ids[position] == json_id:
+            self.update_row(json_id)
+            return
+        self.__ids.insert(position, json_id)
+        if position < self.__start:
+            self.__start += 1
+            self.__end += 1
+        elif position < self.__end or self.__end == len(self.__ids) - 1:
+            self.__insert(position - self.__start, json_id)
+            self.__end += 1
+
+    def update_row(self, json_id: int):
+        """
+        Renders row values again if row is loaded.
+        :param int json_id: row id
+        :return: Nothing
+        """
+        if self.tree.exists(str(json_id)):
+            self.tree.item(str(json_id), values=(self.__render_values(json_id)))
+
+    def delete_row(self, json_id: int):
+        """
+        Removes row.
+        :param int json_id: row id
+        :return: Nothing
+        """
+        position = bisect_left(self.__ids, json_id)
+        if position == len(self.__ids) or self.__ids[position] != json_id:
+            return
+        del self.__ids[position]
+        if position < self.__start:
+            self.__start -= 1
+            self.__end -= 1
+        elif position < self.__end:
+            self.tree.delete(str(json_id))
+            self.__end -= 1
+
+    def __insert(self, index, json_id: int):
+        """
+        Inserts treeview row of given id.
+        :param index: position among loaded rows or 'end'
+        :param int json_id: row id
+        :return: Nothing
+        """
+        self.tree.insert('',
+                         index,
+                         iid=str(json_id),
+                         text=json_id,
+                         values=(self.__render_values(json_id)))
+
+    def __return_view_top(self):
+        """
+        Returns position of first visible row among loaded rows.
+        :return: int row position
+        """
+        return round(self.tree.yview()[0] * (self.__end - self.__start))
+
+    def __move_view(self, top: int):
+        """
+        Scrolls view, so row at given position is first visible row. Keeps visible rows in place
+        after rows above them were inserted or deleted.
+        :param int top: position of row among loaded rows
+        :return: Nothing
+        """
+        loaded = self.__end - self.__start
+        if loaded:
+            self.tree.yview_moveto(max(top, 0) / loaded)
+
+    def __on_scroll(self, first, last):
+        """
+        Treeview scroll callback. Loads next or previous chunk when less than overscan rows are left
+        below or above view.
+        :param str first: top of view as fraction of loaded rows
+        :param str last: bottom of view as fraction of loaded rows
+        :return: Nothing
+        """
+        if self.__loading:
+            return
+        loaded = self.__end - self.__start
+        if self.__end < len(self.__ids) and (1.0 - float(last)) * loaded < self.overscan:
+            self.__loading = True
+            self.tree.after_idle(self.load_more)
+        elif self.__start > 0 and float(first) * loaded < self.overscan:
+            self.__loading = True
+            self.tree.after_idle(self.load_previous)
+
+
+class MainWindowAnalytics:
+
+    __title = "Raport zleceń"
+    granularity_labels = {
+        "Dzień": "day",
+        "Tydzień": "week",
+        "Miesiąc": "month",
+        "Przedmiot": "item"
+    }
+    columns = ["period", "revenue", "cost", "profit", "hours", "tasks"]
+    column_settings = [
+        ["Period", 100],
+        ["Revenue", 100],
+        ["Cost", 100],
+        ["Profit", 100],
+        ["Hours", 80],
+        ["Tasks", 60]
+    ]
+    report_list_height = 15
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.window = None
+        self.tree = None
+        self.granularity = "month"
+
+    # region Public methods
+
+    def open(self):
+        """
+        Shows report window, window is created once and raised when opened again.
+        :return: Nothing
+        """
+        if self.window and self.window.winfo_exists():
+            self.window.lift()
+            self.refresh()
+            return
+        self.window = Toplevel(self.parent)
+        self.window.title(self.__title)
+        granularity_value = StringVar(self.window, self.granularity)
+
+        def change_granularity():
+            self.granularity = granularity_value.get()
+            self.refresh()
+
+        x_position = 15
+        for text, value in self.granularity_labels.items():
+            Radiobutton(self.window,
+                        text=text,
+                        value=value,
+                        indicatoron=False,
+                        variable=granularity_value,
+                        command=change_granularity).place(x=x_position, y=10)
+            x_position += 90
+        self.tree = tkinter.ttk.Treeview(self.window, show="headings", height=self.report_list_height)
+        self.tree.configure(columns=self.columns, displaycolumns=self.columns)
+        for index, (heading, width) in enumerate(self.column_settings):
+            hash_id = "# " + str(index + 1)
+            self.tree.column(hash_id, anchor=CENTER, stretch=NO, width=width)
+            self.tree.heading(hash_id, text=heading)
+        self.tree.place(x=15, y=50)
+        width = sum(column_width for heading, column_width in self.column_settings) + 30
+        self.window.geometry(f"{width}x{self.report_list_height * 20 + 90}")
+        self.refresh()
+
+    def refresh(self):
+        """
+        Fills report treeview, only pre-aggregated cube is read.
+        :return: Nothing
+        """
+        if not self.window or not self.window.winfo_exists():
+            return
+        analytics = data_engine.DataReader(False).return_analytics()
+        self.tree.delete(*self.tree.get_children())
+        for period, values in analytics.return_report(self.granularity):
+            self.tree.insert('',
+                             'end',
+                             values=[period] + [round(values[measure], 2) for measure in analytics.measures])
+
+    # endregion
+
 
 class MainWindow:
 
     __item_list_label = "Lista przedmiotów"
     __task_list_label = "Lista zleceń"
+    __search_label = "Szukaj:"
+    __report_label = "Raport"
     __mainloop_main_treeview_selection = None
     main_values = {
         __item_list_label: "1",
         __task_list_label: "2"
     }
     select_list_rad_btn_x_start_pos = 250
+    changes_poll_interval = 100
+    loading_poll_interval = 50
+    loading_label_text = "Loading data..."
     treeview_ti_obj = treeview_materials_obj = treeview_work_materials_obj = treeview_steps_obj = None
+    treeview_ti_loader = None
     treeview_materials_label = treeview_work_materials_label = treeview_steps_label = None
 
-    def __init__(self):
+    def __init__(self, profiler=None):
+        self.profiler = profiler
         config = data_engine.WindowConfigReader()
         config.read_main_window_config()
         self.geometry = config.return_geometry()
@@ -147,9 +461,22 @@ class MainWindow:
         self.minsize = config.return_minsize()
         self.title = config.return_title()
         self.ti_list_height = config.return_ti_list_height()
+        self.ti_list_overscan = config.return_ti_list_overscan()
         self.item_material_height = config.return_material_list_height()
         self.item_work_material_height = config.return_work_material_list_height()
         self.steps_height = config.return_steps_list_height()
+        self.details_cache = MainWindowDetailsCache(config.return_details_cache_size())
+        self.details_rows = {}
+        self.pending_changes = queue.Queue()
+        self.data_loaded = threading.Event()
+        self.loading_error = None
+        self.search_text = ""
+        self.analytics_window = None
+        self.preview_rows = None
+        self.preview_shown = False
+        if profiler:
+            profiler.budget = config.return_startup_budget()
+            profiler.mark("config")
         if config.return_default_view() == "Items":
             self.select_list_rad_btn_value = 1
         elif config.return_default_view() == "Tasks":
@@ -174,30 +501,37 @@ class MainWindow:
             :return: Nothing
             """
             self.select_list_rad_btn_value = list_def_value.get()
+            if not self.data_loaded.is_set():
+                return
             generate_ti_view_mainloop()
             generate_details_view_mainloop()
 
         def create_treeview_main_mainloop(item_type: bool):
             """
-            Creates treeview element in mainloop.
+            Creates treeview element in mainloop, existing treeview is reused.
             :return: Nothing
             """
-            self.__create_treeview_main(main_frame, item_type)
-            self.treeview_ti_obj.bind('<Button-1>', read_ti_treeview)
+            if not self.treeview_ti_obj:
+                self.__create_treeview_main(main_frame)
+                self.treeview_ti_obj.bind('<<TreeviewSelect>>', read_ti_treeview)
+            self.__fill_treeview_main(item_type)
 
         def read_ti_treeview(event):
             """
-            Reads which item is selected form tasks/items treeview
+            Reads which item is selected form tasks/items treeview, selection changes by mouse and arrow keys
             :param event: binded event
             :return: Nothing
             """
-            rowid = self.treeview_ti_obj.identify_row(event.y)
-            item = self.treeview_ti_obj.item(rowid)
+            selection = self.treeview_ti_obj.selection()
+            if not selection:
+                return
+            item = self.treeview_ti_obj.item(selection[0])
             self.__mainloop_main_treeview_selection = item
-            generate_details_view_mainloop()
+            if self.data_loaded.is_set():
+                generate_details_view_mainloop()
 
         def generate_details_view_mainloop():
-            destroy_treeview_details()
+            hide_treeview_details()
             if self.__mainloop_main_treeview_selection:
                 selected_id = self.__mainloop_main_treeview_selection["text"]
             else:
@@ -208,34 +542,168 @@ class MainWindow:
             if self.select_list_rad_btn_value == "2" or self.select_list_rad_btn_value == 2:
                 print("Tasks")
 
-        def destroy_treeview_details():
+        def hide_treeview_details():
             """
-            Destroys old treeview details form mainloop.
+            Hides treeview details form mainloop, they are shown again for next item.
             :return: Nothing
             """
-            if self.treeview_materials_obj:
-                self.treeview_materials_obj.destroy()
-                self.treeview_materials_label.destroy()
-            if self.treeview_work_materials_obj:
-                self.treeview_work_materials_obj.destroy()
-                self.treeview_work_materials_label.destroy()
-            if self.treeview_steps_obj:
-                self.treeview_steps_obj.destroy()
-                self.treeview_steps_label.destroy()
+            for widget in (self.treeview_materials_obj, self.treeview_materials_label,
+                           self.treeview_work_materials_obj, self.treeview_work_materials_label,
+                           self.treeview_steps_obj, self.treeview_steps_label):
+                if widget:
+                    widget.place_forget()
 
         def generate_ti_view_mainloop():
             """
             Generates tasks/items treeview.
             :return: Nothing
             """
-            if self.treeview_ti_obj:
-                self.treeview_ti_obj.destroy()
             if self.select_list_rad_btn_value == "1" or self.select_list_rad_btn_value == 1:
                 create_treeview_main_mainloop(True)
             if self.select_list_rad_btn_value == "2" or self.select_list_rad_btn_value == 2:
                 create_treeview_main_mainloop(False)
             generate_details_view_mainloop()
 
+        def apply_changes_mainloop():
+            """
+            Applies changes written since last call on tasks/items treeview. Called periodically.
+            :return: Nothing
+            """
+            selected_changed = False
+            report_changed = False
+            while not self.pending_changes.empty():
+                section, change, ids = self.pending_changes.get()
+                report_changed = True
+                if section != ("Items" if self.select_list_rad_btn_value in ("1", 1) else "Tasks"):
+                    continue
+                found_ids = None
+                if section == "Items" and self.search_text.strip() and \
+                        change != data_engine.ChangeNotifier.delete_change:
+                    found_ids = set(data_engine.DataReader(True).search_items(self.search_text))
+                for json_id in ids:
+                    if found_ids is not None:
+                        # Changed item can start or stop matching searched text
+                        if json_id in found_ids:
+                            self.treeview_ti_loader.insert_row(json_id)
+                        else:
+                            self.treeview_ti_loader.delete_row(json_id)
+                    elif change == data_engine.ChangeNotifier.insert_change:
+                        self.treeview_ti_loader.insert_row(json_id)
+                    elif change == data_engine.ChangeNotifier.update_change:
+                        self.treeview_ti_loader.update_row(json_id)
+                    else:
+                        self.treeview_ti_loader.delete_row(json_id)
+                if self.__mainloop_main_treeview_selection and \
+                        str(self.__mainloop_main_treeview_selection["text"]) in [str(json_id) for json_id in ids]:
+                    if change == data_engine.ChangeNotifier.delete_change:
+                        self.__mainloop_main_treeview_selection = None
+                    selected_changed = True
+            if selected_changed:
+                generate_details_view_mainloop()
+            if report_changed and self.analytics_window:
+                self.analytics_window.refresh()
+            window.after(self.changes_poll_interval, apply_changes_mainloop)
+
+        def load_data_background():
+            """
+            Parses library and builds items/tasks stores. Runs in worker thread.
+            First page of current list is streamed from json file before, so it can be shown at once.
+            :return: Nothing
+            """
+            try:
+                if data_engine.EngineConfigReader().return_backend() == "json":
+                    self.__stream_preview_rows(self.select_list_rad_btn_value in ("1", 1))
+            except Exception as error:
+                print(f"Preview of data failed: {error}")
+            try:
+                with data_engine.BaseReader.document_lock:
+                    items_reader = data_engine.DataReader(True)
+                    data_engine.DataReader(False)
+                    # Search index and rollup are built here, so first typed letter does not wait for them
+                    data_engine.ItemSearchIndex.for_store(items_reader.store)
+                    items_reader.return_rollup()
+            except Exception as error:
+                self.loading_error = error
+            if self.profiler:
+                self.profiler.mark("data_load")
+            self.data_loaded.set()
+
+        def wait_for_data_mainloop():
+            """
+            Checks if data is loaded, then fills up window and starts listening for changes.
+            :return: Nothing
+            """
+            if not self.data_loaded.is_set():
+                if self.preview_rows is not None and not self.preview_shown:
+                    show_preview_mainloop()
+                window.after(self.loading_poll_interval, wait_for_data_mainloop)
+                return
+            if self.loading_error:
+                loading_label.configure(text=f"Loading failed: {self.loading_error}")
+                if self.profiler:
+                    self.profiler.fail("first_paint", self.loading_error)
+                    print(self.profiler.report())
+                    close_window_mainloop()
+                return
+            loading_label.place_forget()
+            generate_ti_view_mainloop()
+            data_engine.ChangeNotifier.subscribe(self.__queue_change)
+            window.after(self.changes_poll_interval, apply_changes_mainloop)
+            if self.profiler:
+                window.update_idletasks()
+                self.profiler.mark("first_paint")
+                print(self.profiler.report())
+                close_window_mainloop()
+
+        def show_preview_mainloop():
+            """
+            Shows streamed first page of tasks/items treeview, it is replaced when library is loaded.
+            :return: Nothing
+            """
+            self.preview_shown = True
+            item_type, records = self.preview_rows
+            if not self.treeview_ti_obj:
+                self.__create_treeview_main(main_frame)
+                self.treeview_ti_obj.bind('<<TreeviewSelect>>', read_ti_treeview)
+            settings_obj = MainWindowMainloopTISettings(item_type)
+            self.__configure_treeview_columns(self.treeview_ti_obj, settings_obj.columns, settings_obj.column_settings)
+            self.treeview_ti_loader.load(
+                list(records),
+                lambda json_id: settings_obj.render_row_values(json_id, records[json_id])
+            )
+            loading_label.place(x=20, y=self.ti_list_height * 20 + 90)
+
+        def search_mainloop(*args):
+            """
+            Filters items treeview while text is typed into search box.
+            :param args: StringVar trace arguments
+            :return: Nothing
+            """
+            self.search_text = search_value.get()
+            if not self.data_loaded.is_set() or self.loading_error:
+                return
+            if self.select_list_rad_btn_value == "1" or self.select_list_rad_btn_value == 1:
+                create_treeview_main_mainloop(True)
+
+        def open_report_mainloop():
+            """
+            Opens tasks report window.
+            :return: Nothing
+            """
+            if not self.data_loaded.is_set() or self.loading_error:
+                return
+            if not self.analytics_window:
+                self.analytics_window = MainWindowAnalytics(window)
+            self.analytics_window.open()
+
+        def close_window_mainloop():
+            """
+            Stops listening for changes and closes window.
+            :return: Nothing
+            """
+            data_engine.ChangeNotifier.unsubscribe(self.__queue_change)
+            window.destroy()
+
         # endregion
 
         main_frame = Frame(window)
@@ -250,9 +718,25 @@ class MainWindow:
                                               command=get_radio_value_mainloop)
             select_list_rad_btn.place(x=self.select_list_rad_btn_x_start_pos, y=10)
             self.select_list_rad_btn_x_start_pos += 110
-
-        generate_ti_view_mainloop()
-
+        report_button = Button(main_frame, text=self.__report_label, command=open_report_mainloop)
+        report_button.place(x=self.select_list_rad_btn_x_start_pos, y=8)
+
+        search_label = tkinter.Label(main_frame, text=self.__search_label)
+        search_label.place(x=15, y=12)
+        search_value = StringVar(main_frame, "")
+        search_value.trace_add("write", search_mainloop)
+        search_entry = tkinter.Entry(main_frame, textvariable=search_value, width=20)
+        search_entry.place(x=70, y=12)
+
+        loading_label = tkinter.Label(main_frame, text=self.loading_label_text)
+        loading_label.place(x=20, y=50)
+        threading.Thread(target=load_data_background, name="DataLoader", daemon=True).start()
+
+        window.protocol("WM_DELETE_WINDOW", close_window_mainloop)
+        window.after(self.loading_poll_interval, wait_for_data_mainloop)
+        if self.profiler:
+            window.update_idletasks()
+            self.profiler.mark("window")
         window.mainloop()
 
     # endregion
@@ -261,73 +745,138 @@ class MainWindow:
     # region Item view
 
     def __generate_item_details_view(self, frame, item_id):
-        self.__create_treeview_details(frame, item_id)
-        self.__create_treeview_labels(frame)
+        """
+        Shows details of given item, treeviews are created once and refreshed for next items.
+        :param frame: frame object
+        :param int item_id: selected item id
+        :return: Nothing
+        """
+        if not self.treeview_materials_obj:
+            self.__create_treeview_details(frame)
+            self.__create_treeview_labels(frame)
+        setting_obj = self.details_cache.return_settings(True, item_id)
+        details_list = [
+            (self.treeview_materials_obj, setting_obj.return_material_treeview_settings()),
+            (self.treeview_work_materials_obj, setting_obj.return_work_material_treeview_settings()),
+            (self.treeview_steps_obj, setting_obj.return_steps_treeview_settings())
+        ]
+        start_position = 178
+        for index, (tree, settings) in enumerate(details_list):
+            self.__refresh_treeview_rows(tree, settings)
+            [self.treeview_materials_label,
+             self.treeview_work_materials_label,
+             self.treeview_steps_label][index].place(x=20, y=start_position)
+            tree.place(x=15, y=start_position + 22)
+            start_position += 150
 
     def __create_treeview_labels(self, frame):
         # TODO: przeliczyć i dopisać uwzględnienie wysokości treeview
-        start_position = 178
         result = []
         label_list = ["Materials", "Work Materials", "Steps list"]
         for label_data in label_list:
             text_var = StringVar()
             text_var.set(label_data)
             label = tkinter.Label(frame, textvariable=text_var)
-            label.place(x=20, y=start_position)
-            start_position += 150
             result.append(label)
         self.treeview_materials_label = result[0]
         self.treeview_work_materials_label = result[1]
         self.treeview_steps_label = result[2]
 
-    def __create_treeview_details(self, frame, item_id):
+    def __create_treeview_details(self, frame):
         """
-        Creates treeview with materials
+        Creates empty treeviews for materials, work materials and steps
         :param frame: frame object
-        :param int item_id: selected item id
-        :return: treeview object
+        :return: Nothing
         """
-        setting_obj = MainWindowMainloopDetailSettings(True, item_id)
+        reader = data_engine.TreeviewConfigReader()
+        reader.read_items_data()
         mainloop_obj_list = []
-        details_commands_list = [
-            setting_obj.return_material_treeview_settings(),
-            setting_obj.return_work_material_treeview_settings(),
-            setting_obj.return_steps_treeview_settings()
+        details_data_list = [
+            reader.return_material_treeview(),
+            reader.return_work_material_treeview(),
+            reader.return_steps_treeview()
         ]
         mainloop_obj_heights = [
             self.item_material_height,
             self.item_work_material_height,
             self.steps_height
         ]
-        start_position = 200
-        for iterator in range(len(details_commands_list)):
+        for iterator in range(len(details_data_list)):
             tree = self.__create_treeview_generic(
                 frame,
                 mainloop_obj_heights[iterator],
-                details_commands_list[iterator]
+                [details_data_list[iterator][0], details_data_list[iterator][1], {}, []]
             )
-            tree.place(x=15, y=start_position)
             mainloop_obj_list.append(tree)
-            start_position += 150
 
         self.treeview_materials_obj = mainloop_obj_list[0]
         self.treeview_work_materials_obj = mainloop_obj_list[1]
         self.treeview_steps_obj = mainloop_obj_list[2]
 
+    def __refresh_treeview_rows(self, tree, settings):
+        """
+        Updates treeview rows in place, only changed rows are inserted, updated or deleted.
+        :param tree: treeview object
+        :param settings: arr with treeview settings
+        :return: Nothing
+        """
+        shown_rows = self.details_rows.setdefault(str(tree), {})
+        new_rows = {}
+        for index, json_id in enumerate(settings[2]):
+            new_rows[str(json_id)] = (json_id, tuple(settings[3][index]))
+        removed_rows = [row_id for row_id in shown_rows if row_id not in new_rows]
+        if removed_rows:
+            tree.delete(*removed_rows)
+        for index, (row_id, (json_id, values)) in enumerate(new_rows.items()):
+            if row_id not in shown_rows:
+                tree.insert('', index, iid=row_id, text=json_id, values=values)
+            elif shown_rows[row_id] != values:
+                tree.item(row_id, values=values)
+        new_rows = {row_id: values for row_id, (json_id, values) in new_rows.items()}
+        self.details_rows[str(tree)] = new_rows
+
     # endregion
 
-    def __create_treeview_main(self, frame, item_type: bool):
+    def __stream_preview_rows(self, item_type: bool):
+        """
+        Reads first page of tasks/items from json file without loading whole library.
+        :param bool item_type: True for items, False for tasks
+        :return: Nothing
+        """
+        records = {}
+        page_size = self.ti_list_height + self.ti_list_overscan
+        section = "Items" if item_type else "Tasks"
+        for _, json_id, record in data_engine.JsonStreamReader().iterate_records((section,)):
+            records[json_id] = record
+            if len(records) >= page_size:
+                break
+        self.preview_rows = (item_type, records)
+
+    def __create_treeview_main(self, frame):
         """
-        Creates treeview with tasks/items
+        Creates treeview for tasks/items
         :param frame: frame object
-        :return: treeview object
+        :return: Nothing
         """
-        settings_obj = MainWindowMainloopTISettings(item_type)
-        settings = settings_obj.return_treeview_settings()
-        tree = self.__create_treeview_generic(frame, self.ti_list_height, settings)
+        tree = tkinter.ttk.Treeview(frame, show="headings", height=self.ti_list_height)
         tree.bind('<Double-1>', self.__treeview_dobule_event)
         tree.place(x=15, y=50)
         self.treeview_ti_obj = tree
+        self.treeview_ti_loader = TreeviewLazyLoader(
+            tree,
+            self.ti_list_height + self.ti_list_overscan,
+            self.ti_list_overscan
+        )
+
+    def __fill_treeview_main(self, item_type: bool):
+        """
+        Fills treeview with tasks/items
+        :param bool item_type: True for items, False for tasks
+        :return: Nothing
+        """
+        settings_obj = MainWindowMainloopTISettings(item_type)
+        self.__configure_treeview_columns(self.treeview_ti_obj, settings_obj.columns, settings_obj.column_settings)
+        self.treeview_ti_loader.load(settings_obj.return_ids(self.search_text), settings_obj.return_row_values)
 
     @staticmethod
     def __create_treeview_generic(frame, treeview_height: int, settings):
@@ -339,14 +888,9 @@ class MainWindow:
         :return: treeview object
         """
         tree = tkinter.ttk.Treeview(frame,
-                                    columns=(settings[0]),
                                     show="headings",
                                     height=treeview_height)
-        column_settings = settings[1]
-        for index in range(len(column_settings)):
-            hash_id = "# " + str(index + 1)
-            tree.column(hash_id, anchor=CENTER, stretch=NO, width=int(column_settings[index][1]))
-            tree.heading(hash_id, text=column_settings[index][0])
+        MainWindow.__configure_treeview_columns(tree, settings[0], settings[1])
 
         full_data = settings[2]
         iterator = 0
@@ -359,6 +903,31 @@ class MainWindow:
 
         return tree
 
+    @staticmethod
+    def __configure_treeview_columns(tree, columns, column_settings):
+        """
+        Sets treeview columns and headings
+        :param tree: treeview object
+        :param columns: arr with columns names
+        :param column_settings: arr with columns headings and widths
+        :return: Nothing
+        """
+        tree.configure(columns=columns, displaycolumns=columns)
+        for index in range(len(column_settings)):
+            hash_id = "# " + str(index + 1)
+            tree.column(hash_id, anchor=CENTER, stretch=NO, width=int(column_settings[index][1]))
+            tree.heading(hash_id, text=column_settings[index][0])
+
+    def __queue_change(self, section: str, change: str, ids: list):
+        """
+        Change listener, passes written changes to window thread.
+        :param str section: Items/Tasks
+        :param str change: insert/update/delete
+        :param list ids: changed ids
+        :return: Nothing
+        """
+        self.pending_changes.put((section, change, ids))
+
     def __treeview_dobule_event(self, event):
         print("edit window", event)
 
@@ -0,0 +1,64 @@
+import time
+
+
+class StartupProfiler:
+
+    def __init__(self, start_time: float = None, budget: dict = None):
+        self.start_time = start_time if start_time else time.perf_counter()
+        self.budget = budget if budget else {}
+        # Milestone name -> seconds from start, filled in order of marks
+        self.marks = {}
+        # Milestone name -> error which stopped startup before it
+        self.failures = {}
+
+    # region Public methods
+
+    def mark(self, name: str):
+        """
+        Saves time of startup milestone.
+        :param str name: milestone name
+        :return: Nothing
+        """
+        self.marks[name] = time.perf_counter() - self.start_time
+
+    def fail(self, name: str, error: Exception):
+        """
+        Saves error which stopped startup before milestone.
+        :param str name: milestone name
+        :param Exception error: error
+        :return: Nothing
+        """
+        self.failures[name] = error
+
+    def return_exceeded(self):
+        """
+        Returns milestones reached later than budget allows.
+        :return: list of milestone names
+        """
+        result = []
+        for name, limit in self.budget.items():
+            if name in self.marks and self.marks[name] > limit:
+                result.append(name)
+        return result
+
+    def report(self):
+        """
+        Renders startup report.
+        :return: str report with time from start and from previous milestone
+        """
+        lines = ["Startup profile (seconds):"]
+        previous = 0.0
+        exceeded = self.return_exceeded()
+        for name, seconds in sorted(self.marks.items(), key=lambda mark: mark[1]):
+            line = f"  {name:<12} {seconds:8.3f}  (+{seconds - previous:.3f})"
+            if name in self.budget:
+                line += f"  budget {self.budget[name]:.3f}"
+                if name in exceeded:
+                    line += "  EXCEEDED"
+            lines.append(line)
+            previous = seconds
+        for name, error in self.failures.items():
+            lines.append(f"  {name:<12} FAILED: {error}")
+        return "\n".join(lines)
+
+    # endregion
@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import data_engine
+
+REPO_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class BulkTransferImportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for file_name in ("config.json", "data.json"):
+            shutil.copy(os.path.join(REPO_DIRECTORY, file_name), self.directory)
+        self.previous_directory = os.getcwd()
+        os.chdir(self.directory)
+        data_engine.BaseReader.clear_cache()
+
+    def tearDown(self):
+        os.chdir(self.previous_directory)
+        data_engine.BaseReader.clear_cache()
+        shutil.rmtree(self.directory)
+
+    def test_import_writes_library_once(self):
+        data_engine.BulkTransfer(True).export_file("items.jsonl")
+        items_before = len(data_engine.DataReader(True).return_ids())
+        atomic_write = data_engine.BaseReader.atomic_write
+        with mock.patch.object(data_engine.BaseReader, "atomic_write", side_effect=atomic_write) as write, \
+                mock.patch.object(data_engine.BaseReader, "append_journal",
+                                  side_effect=data_engine.BaseReader().append_journal) as append:
+            new_ids = data_engine.BulkTransfer(True).import_file("items.jsonl")
+        library = data_engine.BaseReader().library_file_name
+        library_writes = [call for call in write.call_args_list if call.args[0] == library]
+        self.assertEqual(len(library_writes) + append.call_count, 1)
+        self.assertEqual(len(data_engine.DataReader(True).return_ids()), items_before + len(new_ids))
+
+
+if __name__ == "__main__":
+    unittest.main()